@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -134,7 +135,59 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Local memory by default. It is private to each process, so invalidations
+# made by ingest commands or other web workers never reach it: set REDIS_URL
+# for any deployment with more than one process (``check --deploy`` warns).
+# Deck sessions get their own cache so payload churn never evicts them.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        },
+        "deck_queues": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "KEY_PREFIX": "deck-queues",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "dreamdoor",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+        "deck_queues": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "dreamdoor-deck-queues",
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("DECK_QUEUE_MAX_SESSIONS", "5000"))},
+        },
+    }
+
+# Read-through cache for house payloads (houses.cache).
+HOUSE_CACHE_ALIAS = "default"
+HOUSE_PAYLOAD_CACHE_SECONDS = int(os.getenv("HOUSE_PAYLOAD_CACHE_SECONDS", "3600"))
+
+# Per-client next-cards queues (houses.deckqueue).
+DECK_QUEUE_CACHE_ALIAS = "deck_queues"
+DECK_QUEUE_SIZE = int(os.getenv("DECK_QUEUE_SIZE", "200"))
+DECK_QUEUE_BATCH = int(os.getenv("DECK_QUEUE_BATCH", "10"))
+DECK_QUEUE_WARM = int(os.getenv("DECK_QUEUE_WARM", "5"))
+DECK_QUEUE_SECONDS = int(os.getenv("DECK_QUEUE_SECONDS", "3600"))
+# Warm upcoming payloads on a background thread instead of in the request.
+DECK_QUEUE_WARM_ASYNC = os.getenv("DECK_QUEUE_WARM_ASYNC", "True") == "True"
+
+# Write-behind buffer for POST /api/swipes/ (houses.swipes).
+SWIPE_BUFFER_SIZE = int(os.getenv("SWIPE_BUFFER_SIZE", "200"))
+SWIPE_FLUSH_SECONDS = float(os.getenv("SWIPE_FLUSH_SECONDS", "2"))
+SWIPE_FLUSH_ATTEMPTS = int(os.getenv("SWIPE_FLUSH_ATTEMPTS", "3"))
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "houses.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 70,
 }
@@ -0,0 +1,111 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from houses.conditional import make_etag
+from houses.projection import PRESETS
+from houses.renderers import FastJSONRenderer
+
+
+PAYLOAD_KINDS = ("detail", "photos")
+# Cached variants of each payload kind; other ?fields= projections are
+# built from the database on every request.
+PAYLOAD_VARIANTS = {
+    "detail": ("full", "card"),
+    "photos": ("full",),
+}
+# Variant -> the ?fields= paths it answers (part of its ETag).
+VARIANT_FIELDS = {
+    "full": None,
+    "card": PRESETS["card"],
+}
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, "HOUSE_CACHE_ALIAS", "default")]
+
+
+def _record(kind, outcome):
+    with _stats_lock:
+        _stats[f"{kind}_{outcome}"] += 1
+
+
+def cache_stats():
+    """Hit/miss counts for this process since start (or the last reset)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    for kind in PAYLOAD_KINDS:
+        hits = stats.setdefault(f"{kind}_hits", 0)
+        misses = stats.setdefault(f"{kind}_misses", 0)
+        stats[f"{kind}_hit_rate"] = round(hits / (hits + misses), 3) if hits + misses else None
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def payload_key(kind, house_id, variant="full"):
+    return f"houses:{kind}:{house_id}:{variant}"
+
+
+def render(data):
+    return FastJSONRenderer().render(data)
+
+
+def json_response(body, outcome):
+    """Wrap pre-rendered JSON ``body``; ``outcome`` goes in the X-Cache header."""
+    response = HttpResponse(body, content_type="application/json")
+    response["X-Cache"] = outcome
+    return response
+
+
+def get_payload(kind, house_id, variant):
+    entry = get_cache().get(payload_key(kind, house_id, variant))
+    _record(kind, "hits" if entry is not None else "misses")
+    return entry
+
+
+def payload_entry(kind, house_id, variant, payload, fetched_at):
+    """Render a payload into a cache entry with its ETag and Last-Modified."""
+    return {
+        "body": render(payload),
+        "etag": make_etag(kind, house_id, fetched_at, VARIANT_FIELDS[variant]),
+        "last_modified": fetched_at,
+    }
+
+
+def set_payload(kind, house_id, variant, payload, fetched_at):
+    entry = payload_entry(kind, house_id, variant, payload, fetched_at)
+    get_cache().set(
+        payload_key(kind, house_id, variant),
+        entry,
+        getattr(settings, "HOUSE_PAYLOAD_CACHE_SECONDS", 3600),
+    )
+    return entry
+
+
+def cached_payload_keys(keys):
+    """Return the subset of payload ``keys`` already in the cache."""
+    return set(get_cache().get_many(keys))
+
+
+def set_payloads(entries):
+    """Store ``{key: entry}`` in one round trip."""
+    if entries:
+        get_cache().set_many(entries, getattr(settings, "HOUSE_PAYLOAD_CACHE_SECONDS", 3600))
+
+
+def invalidate_payloads(kind, house_ids):
+    """Drop every cached variant of ``kind`` for ``house_ids``."""
+    keys = [payload_key(kind, house_id, variant) for house_id in house_ids for variant in PAYLOAD_VARIANTS[kind]]
+    if keys:
+        get_cache().delete_many(keys)
+
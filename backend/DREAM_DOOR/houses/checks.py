@@ -0,0 +1,30 @@
+from django.core import checks
+from django.core.cache.backends.locmem import LocMemCache
+
+from houses.cache import get_cache
+from houses.deckqueue import get_queue_cache
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # Payloads are invalidated by whichever process writes the data, and a
+    # client's deck session may be read by any worker, so every process must
+    # see the same caches.
+    errors = []
+    if isinstance(get_cache(), LocMemCache):
+        errors.append(
+            checks.Warning(
+                "The house payload cache is in local memory, which each process keeps separately.",
+                hint="Set REDIS_URL when more than one process serves requests or runs ingest commands.",
+                id="houses.W001",
+            )
+        )
+    if isinstance(get_queue_cache(), LocMemCache):
+        errors.append(
+            checks.Warning(
+                "Deck sessions are in local memory, which each process keeps separately.",
+                hint="Set REDIS_URL when more than one process serves requests.",
+                id="houses.W002",
+            )
+        )
+    return errors
@@ -0,0 +1,32 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Build an ETag from the values a response depends on."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def not_modified(request, etag, last_modified=None):
+    """Return a 304 response if the client's copy is current, else None.
+
+    Call this before serializing, so a revalidation costs only the query
+    that loaded the timestamps.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None):
+    """Set ETag/Last-Modified and ask clients to revalidate before reuse."""
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
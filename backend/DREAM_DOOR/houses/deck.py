@@ -0,0 +1,114 @@
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from houses.geo import bounding_box_filter, distance_miles, radius_bounds
+from houses.models import House, HouseDislike, HouseLike, HouseSave
+
+
+# Query parameter -> (House lookup, parser).
+RANGE_FILTERS = {
+    "min_price": ("price__gte", int),
+    "max_price": ("price__lte", int),
+    "min_beds": ("beds__gte", int),
+    "max_beds": ("beds__lte", int),
+    "min_baths": ("baths__gte", float),
+    "max_baths": ("baths__lte", float),
+    "min_sqft": ("sqft__gte", int),
+    "max_sqft": ("sqft__lte", int),
+}
+# Query parameter -> House field; values are comma separated.
+CHOICE_FILTERS = {
+    "zip": "postal_code",
+    "state": "state",
+    "property_type": "property_type",
+}
+MAX_RADIUS_MILES = 500
+
+
+def _parse_number(params, name, parser):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return parser(value)
+    except ValueError:
+        raise ValidationError({name: f"Expected a number, got {value!r}."})
+
+
+def _parse_choices(params, name):
+    values = []
+    for raw in params.getlist(name):
+        values.extend(value.strip() for value in raw.split(",") if value.strip())
+    return values
+
+
+def _parse_bbox(params):
+    value = params.get("bbox")
+    if not value:
+        return None
+    try:
+        south, west, north, east = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValidationError({"bbox": "Expected south,west,north,east in degrees."})
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValidationError({"bbox": "Coordinates are out of range."})
+    return south, west, north, east
+
+
+def _parse_radius(params):
+    values = {name: _parse_number(params, name, float) for name in ("lat", "lng", "radius")}
+    if all(value is None for value in values.values()):
+        return None
+    missing = [name for name, value in values.items() if value is None]
+    if missing:
+        raise ValidationError({name: "Required for a radius search." for name in missing})
+    if not (-90 <= values["lat"] <= 90 and -180 <= values["lng"] <= 180):
+        raise ValidationError({"lat": "Coordinates are out of range."})
+    if not 0 < values["radius"] <= MAX_RADIUS_MILES:
+        raise ValidationError({"radius": f"Expected miles between 0 and {MAX_RADIUS_MILES}."})
+    return values["lat"], values["lng"], values["radius"]
+
+
+def apply_geo_filters(qs, params):
+    """Narrow ``qs`` to a ``bbox`` and/or ``radius`` miles around ``lat``/``lng``."""
+    bbox = _parse_bbox(params)
+    if bbox is not None:
+        qs = qs.filter(bounding_box_filter(*bbox))
+    radius = _parse_radius(params)
+    if radius is not None:
+        lat, lng, miles = radius
+        qs = qs.filter(bounding_box_filter(*radius_bounds(lat, lng, miles)))
+        qs = qs.alias(distance=distance_miles(lat, lng)).filter(distance__lte=miles)
+    return qs
+
+
+def unseen_houses():
+    """Houses with no like, dislike or save, as anti-joins on the swipe tables."""
+    return House.objects.filter(
+        ~Exists(HouseLike.objects.filter(house=OuterRef("pk"))),
+        ~Exists(HouseDislike.objects.filter(house=OuterRef("pk"))),
+        ~Exists(HouseSave.objects.filter(house=OuterRef("pk"))),
+    )
+
+
+def build_deck_queryset(params):
+    """Return the deck queryset for request ``params``.
+
+    Swiped houses are excluded unless ``include_seen`` is set; the remaining
+    parameters are optional range, choice and map filters.
+    """
+    if params.get("include_seen") in ("1", "true"):
+        qs = House.objects.all()
+    else:
+        qs = unseen_houses()
+
+    lookups = {}
+    for name, (lookup, parser) in RANGE_FILTERS.items():
+        value = _parse_number(params, name, parser)
+        if value is not None:
+            lookups[lookup] = value
+    for name, field in CHOICE_FILTERS.items():
+        values = _parse_choices(params, name)
+        if values:
+            lookups[f"{field}__in"] = values
+    return apply_geo_filters(qs.filter(**lookups), params)
@@ -0,0 +1,134 @@
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.http import QueryDict
+
+from houses.cache import cached_payload_keys, payload_entry, payload_key, set_payloads
+from houses.deck import build_deck_queryset
+from houses.models import HouseDetail, HousePhoto
+from houses.serializers import HouseSerializer
+
+
+# Payload kinds warmed ahead of the client (their "full" variant).
+WARM_PAYLOADS = {
+    "detail": HouseDetail,
+    "photos": HousePhoto,
+}
+# Warms payloads after a take returns, so requests never wait on it.
+warm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deck-warm")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _queue_key(token):
+    return f"houses:deck-queue:{token}"
+
+
+def get_queue_cache():
+    return caches[_setting("DECK_QUEUE_CACHE_ALIAS", "default")]
+
+
+class DeckQueue:
+    """A client's upcoming deck cards, kept in the deck queue cache.
+
+    The queue holds up to ``DECK_QUEUE_SIZE`` serialized card rows taken from
+    the filtered deck in id order, so taking the next batch is one read and
+    one write of the queue entry, with no database query. Queues live in
+    ``DECK_QUEUE_CACHE_ALIAS``, apart from the payload cache, so payload
+    writes can't evict a live session. The queue refills from the database
+    only once fewer than a batch remain, one query for a whole queue's worth
+    of cards. Detail and photo payloads for the next ``DECK_QUEUE_WARM``
+    cards are written to the payload cache by a background thread (inline
+    when ``DECK_QUEUE_WARM_ASYNC`` is off). Concurrent requests for one
+    token may both receive a card; clients are expected to read serially.
+    """
+
+    def __init__(self, token, params, cards, last_id):
+        self.token = token
+        self.params = params
+        self.cards = cards
+        self.last_id = last_id
+
+    @classmethod
+    def create(cls, params):
+        queue = cls(secrets.token_urlsafe(16), params.urlencode(), [], 0)
+        queue.refill()
+        return queue
+
+    @classmethod
+    def load(cls, token):
+        state = get_queue_cache().get(_queue_key(token))
+        if state is None:
+            return None
+        return cls(token, state["params"], state["cards"], state["last_id"])
+
+    def save(self):
+        state = {
+            "params": self.params,
+            "cards": self.cards,
+            "last_id": self.last_id,
+        }
+        get_queue_cache().set(_queue_key(self.token), state, _setting("DECK_QUEUE_SECONDS", 3600))
+
+    def refill(self):
+        """Top the queue up with unseen houses after the last queued id."""
+        wanted = _setting("DECK_QUEUE_SIZE", 200) - len(self.cards)
+        if wanted <= 0:
+            return
+        qs = build_deck_queryset(QueryDict(self.params)).filter(id__gt=self.last_id).order_by("id")
+        rows = list(qs.values(*HouseSerializer.Meta.fields)[:wanted])
+        if rows:
+            self.cards.extend(rows)
+            self.last_id = rows[-1]["id"]
+
+    def take(self, count):
+        """Pop the next ``count`` cards, refilling if the queue runs low."""
+        batch, self.cards = self.cards[:count], self.cards[count:]
+        if len(self.cards) < count:
+            self.refill()
+        self.save()
+        self.warm()
+        return batch
+
+    def warm(self):
+        """Cache detail/photo payloads for the next cards."""
+        house_ids = [card["id"] for card in self.cards[: _setting("DECK_QUEUE_WARM", 5)]]
+        if not house_ids:
+            return
+        if _setting("DECK_QUEUE_WARM_ASYNC", True):
+            warm_executor.submit(_warm_in_background, house_ids)
+        else:
+            warm_payloads(house_ids)
+
+
+def _warm_in_background(house_ids):
+    try:
+        warm_payloads(house_ids)
+    finally:
+        # Executor threads get their own connection; don't hold it open.
+        connection.close()
+
+
+def warm_payloads(house_ids):
+    """Load uncached detail/photo payloads for ``house_ids`` into the cache.
+
+    Costs one cache read plus at most one query and one cache write per
+    payload kind. Already-cached payloads are skipped, so warming the same
+    cards again is cheap.
+    """
+    for kind, model in WARM_PAYLOADS.items():
+        keys = {payload_key(kind, house_id): house_id for house_id in house_ids}
+        cached = cached_payload_keys(list(keys))
+        missing = [house_id for key, house_id in keys.items() if key not in cached]
+        if not missing:
+            continue
+        rows = model.objects.filter(house_id__in=missing).values_list("house_id", "payload", "fetched_at")
+        set_payloads({
+            payload_key(kind, house_id): payload_entry(kind, house_id, "full", payload, fetched_at)
+            for house_id, payload, fetched_at in rows
+        })
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from houses.models import House, HouseDislike, HouseLike, HouseSave
+
+
+# Swipe table -> denormalized counter on House.
+COUNTERS = {
+    HouseLike: "like_count",
+    HouseDislike: "dislike_count",
+    HouseSave: "save_count",
+}
+
+
+def count_subquery(model):
+    """Number of ``model`` rows for the outer House, as a correlated subquery."""
+    counts = (
+        model.objects.filter(house=OuterRef("pk"))
+        .order_by()
+        .values("house")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _adjusted(field, delta):
+    # Swipe rows created outside the views (admin, shell, seed data) never
+    # bumped the counter, so removing them must not take it below zero.
+    return Greatest(F(field) + delta, Value(0))
+
+
+def adjust_counter(model, house_id, delta):
+    """Add ``delta`` to the House counter for ``model`` with a single UPDATE.
+
+    The counter is floored at zero.
+    """
+    field = COUNTERS[model]
+    House.objects.filter(pk=house_id).update(**{field: _adjusted(field, delta)})
+
+
+def adjust_counters(model, deltas):
+    """Apply ``{house_id: delta}`` to the ``model`` counter in one UPDATE.
+
+    Counters are floored at zero.
+    """
+    deltas = {house_id: delta for house_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    field = COUNTERS[model]
+    increment = Case(
+        *(When(pk=house_id, then=Value(delta)) for house_id, delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    House.objects.filter(pk__in=deltas).update(**{field: _adjusted(field, increment)})
+
+
+def record_swipe(model, house_id):
+    """Create a ``model`` row for a house and bump its counter atomically.
+
+    The counter UPDATE doubles as the existence check (and locks the house
+    row until the insert commits). Returns False if the house doesn't exist.
+    """
+    field = COUNTERS[model]
+    with transaction.atomic():
+        if not House.objects.filter(pk=house_id).update(**{field: F(field) + 1}):
+            return False
+        model.objects.create(house_id=house_id)
+    return True
+
+
+def record_save(house_id):
+    """Save a house once; return ``(found, created)``.
+
+    A new save costs an UPDATE and an INSERT; a repeat save an UPDATE that
+    matches nothing and an existence check.
+    """
+    with transaction.atomic():
+        unsaved = House.objects.filter(pk=house_id).exclude(
+            Exists(HouseSave.objects.filter(house=OuterRef("pk")))
+        )
+        if unsaved.update(save_count=F("save_count") + 1):
+            HouseSave.objects.create(house_id=house_id)
+            return True, True
+    return House.objects.filter(pk=house_id).exists(), False
+
+
+def rollup_counters(queryset=None):
+    """Recompute every counter from the swipe tables; return the rows changed.
+
+    Only houses whose stored counts have drifted are written.
+    """
+    queryset = House.objects.all() if queryset is None else queryset
+    actual = {field: count_subquery(model) for model, field in COUNTERS.items()}
+    drifted = queryset.alias(**{f"actual_{field}": value for field, value in actual.items()})
+    condition = None
+    for field in COUNTERS.values():
+        differs = ~Q(**{field: F(f"actual_{field}")})
+        condition = differs if condition is None else condition | differs
+    return House.objects.filter(pk__in=drifted.filter(condition).values("pk")).update(**actual)
@@ -0,0 +1,98 @@
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+
+# Houses are bucketed into a fixed lat/lng grid. Each cell id is
+# ``row * GRID_COLUMNS + column``, so the cells in one grid row are
+# consecutive integers and a bounding box is one indexed range per row.
+# Cells are 0.1 degrees square (about 7 by 7 miles in the continental US).
+CELLS_PER_DEGREE = 10
+GRID_ROWS = 180 * CELLS_PER_DEGREE
+GRID_COLUMNS = 360 * CELLS_PER_DEGREE
+# Wider boxes fall back to the plain lat/lng range filter.
+MAX_CELL_ROWS = 100
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = 69.0
+
+
+def _row(lat):
+    return min(math.floor((lat + 90) * CELLS_PER_DEGREE), GRID_ROWS - 1)
+
+
+def _column(lng):
+    return min(math.floor((lng + 180) * CELLS_PER_DEGREE), GRID_COLUMNS - 1)
+
+
+def grid_cell(lat, lng):
+    """Return the grid cell id for a coordinate, or None if it is missing or invalid."""
+    if lat is None or lng is None:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return _row(lat) * GRID_COLUMNS + _column(lng)
+
+
+def _column_spans(west, east):
+    # A box whose west edge is east of its east edge crosses the antimeridian.
+    if west <= east:
+        return [(_column(west), _column(east))]
+    return [(_column(west), GRID_COLUMNS - 1), (0, _column(east))]
+
+
+def cell_ranges(south, west, north, east):
+    """Return ``(first, last)`` cell id ranges covering a bounding box."""
+    ranges = []
+    for row in range(_row(south), _row(north) + 1):
+        for first, last in _column_spans(west, east):
+            ranges.append((row * GRID_COLUMNS + first, row * GRID_COLUMNS + last))
+    return ranges
+
+
+def bounding_box_filter(south, west, north, east):
+    """Q object matching houses inside a bounding box.
+
+    The grid cell ranges let the database use the ``geo_cell`` index; the
+    lat/lng comparisons then trim houses in edge cells that fall outside.
+    """
+    if west <= east:
+        condition = Q(lng__gte=west, lng__lte=east)
+    else:
+        condition = Q(lng__gte=west) | Q(lng__lte=east)
+    condition &= Q(lat__gte=south, lat__lte=north)
+
+    if _row(north) - _row(south) < MAX_CELL_ROWS:
+        cells = Q(pk__in=[])
+        for first, last in cell_ranges(south, west, north, east):
+            cells |= Q(geo_cell__range=(first, last))
+        condition &= cells
+    return condition
+
+
+def radius_bounds(lat, lng, miles):
+    """Return the ``(south, west, north, east)`` box enclosing a radius."""
+    lat_delta = miles / MILES_PER_DEGREE
+    south = max(lat - lat_delta, -90.0)
+    north = min(lat + lat_delta, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    lng_delta = miles / (MILES_PER_DEGREE * cos_lat) if cos_lat > 1e-6 else 360.0
+    if lng_delta >= 180:
+        return south, -180.0, north, 180.0
+    west = lng - lng_delta
+    east = lng + lng_delta
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def distance_miles(lat, lng):
+    """Haversine distance in miles from ``(lat, lng)`` to each house."""
+    lat_delta = Radians(F("lat") - Value(lat, output_field=FloatField())) / 2
+    lng_delta = Radians(F("lng") - Value(lng, output_field=FloatField())) / 2
+    a = Power(Sin(lat_delta), 2) + Cos(Value(math.radians(lat), output_field=FloatField())) * Cos(
+        Radians(F("lat"))
+    ) * Power(Sin(lng_delta), 2)
+    return 2 * EARTH_RADIUS_MILES * ASin(Sqrt(a))
@@ -0,0 +1,163 @@
+import io
+import json
+
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+NUMBER_CHARS = "0123456789.eE+-"
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Buffered character reader over a text stream.
+
+    Only the unread tail of the buffer is kept, so memory is bounded by the
+    largest single value decoded rather than by the document size.
+    """
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise json.JSONDecodeError("Unexpected end of JSON input", self.buffer, self.pos)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode(self):
+        """Decode one complete JSON value starting at the next token."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number cut by the chunk edge decodes as a shorter valid number
+            # ("12.5" -> "12"), so make sure nothing numeric follows it.
+            truncated = end == len(self.buffer) or (
+                isinstance(value, (int, float)) and self.buffer[end] in NUMBER_CHARS
+            )
+            if truncated and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(stream, paths, chunk_size=CHUNK_SIZE):
+    """Yield the items of the array at the highest-priority of ``paths``.
+
+    ``stream`` is a binary or text file-like object holding one JSON
+    document; ``paths`` is a list of key tuples such as
+    ``("data", "results")``, in priority order. Once every higher-priority
+    path is ruled out, the matching array is decoded one item at a time,
+    and everything outside the target paths is skipped without being kept
+    in memory. A lower-priority array that comes first in the document is
+    held in memory until the better paths are ruled out.
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8")
+    reader = _Reader(stream, chunk_size)
+    search = _Search(paths)
+    yield from _walk(reader, (), search)
+    if search.buffered:
+        yield from search.buffered
+
+
+class _Search:
+    """Which target paths are still possible, and the best array found so far."""
+
+    def __init__(self, paths):
+        self.ranks = {}
+        for path in paths:
+            self.ranks.setdefault(tuple(path), len(self.ranks))
+        self.prefixes = {path[:index] for path in self.ranks for index in range(len(path))}
+        self.open = set(self.ranks)
+        self.best = len(self.ranks)
+        self.buffered = None
+        self.done = False
+
+    def settle(self, path):
+        """Rule out every target at or below ``path`` once its value is read."""
+        self.open = {target for target in self.open if target[:len(path)] != path}
+
+    def outranked(self, rank):
+        return any(self.ranks[target] < rank for target in self.open)
+
+
+def _walk(reader, path, search):
+    char = reader.peek()
+    rank = search.ranks.get(path)
+    if char == "[" and rank is not None and rank < search.best:
+        search.best = rank
+        if search.outranked(rank):
+            # A better path may still come later in the document.
+            search.buffered = reader.decode()
+        else:
+            search.buffered = None
+            search.done = True
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+                return
+            while True:
+                yield reader.decode()
+                if reader.peek() == ",":
+                    reader.pos += 1
+                    continue
+                reader.expect("]")
+                return
+    elif char == "{" and path in search.prefixes:
+        # An object here can't be the target array at this path.
+        search.open.discard(path)
+        reader.pos += 1
+        if reader.peek() == "}":
+            reader.pos += 1
+        else:
+            while True:
+                if reader.peek() != '"':
+                    raise json.JSONDecodeError("Expecting property name", reader.buffer, reader.pos)
+                key = reader.decode()
+                reader.expect(":")
+                child = path + (key,)
+                if child in search.ranks or child in search.prefixes:
+                    yield from _walk(reader, child, search)
+                    if search.done:
+                        return
+                else:
+                    reader.decode()
+                if reader.peek() == ",":
+                    reader.pos += 1
+                    continue
+                reader.expect("}")
+                break
+    else:
+        reader.decode()
+    search.settle(path)
+    if search.buffered is not None and not search.outranked(search.best):
+        search.done = True
@@ -0,0 +1,163 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from houses.management.commands.ingest_realty import (
+    DEFAULT_BATCH_SIZE,
+    _extract_listings,
+    _upsert_houses,
+    prepare_listing,
+)
+from houses.realty import format_progress, setup_worker
+
+
+DEFAULT_CHUNK_SIZE = 1000
+# Chunks queued per worker; bounds memory while keeping workers busy.
+CHUNKS_IN_FLIGHT = 2
+
+
+def normalize_chunk(listings, postal_code=""):
+    """Run ``prepare_listing`` over a chunk of raw listings in a worker."""
+    rows = []
+    for listing in listings:
+        prepared = prepare_listing(listing, postal_code)
+        if prepared is not None:
+            rows.append(prepared)
+    return rows
+
+
+def normalize_chunks(chunks, workers):
+    """Yield ``(tag, rows)`` for each ``(tag, listings, postal_code)`` chunk.
+
+    With ``workers > 1`` chunks are normalized in a process pool, at most
+    ``CHUNKS_IN_FLIGHT`` per worker at a time; results keep input order so
+    later pages still win over earlier ones.
+    """
+    if workers <= 1:
+        for tag, listings, postal_code in chunks:
+            yield tag, normalize_chunk(listings, postal_code)
+        return
+
+    # Children must open their own connections rather than share ours.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker) as pool:
+        in_flight = deque()
+        for tag, listings, postal_code in chunks:
+            in_flight.append((tag, pool.submit(normalize_chunk, listings, postal_code)))
+            if len(in_flight) >= workers * CHUNKS_IN_FLIGHT:
+                tag, future = in_flight.popleft()
+                yield tag, future.result()
+        while in_flight:
+            tag, future = in_flight.popleft()
+            yield tag, future.result()
+
+
+def _page_files(paths):
+    files = []
+    for value in paths:
+        path = Path(value)
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.json")))
+        elif path.is_file():
+            files.append(path)
+        else:
+            raise CommandError(f"No such file or directory: {value}")
+    return files
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert House rows from saved Realty in US list responses (JSON files). "
+        "Listings are normalized in a process pool and written by this process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="JSON page files or directories of them.")
+        parser.add_argument(
+            "--zip",
+            dest="postal_code",
+            default="",
+            help="ZIP code for listings that don't include one.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Normalization processes; 1 normalizes in this process.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Raw listings sent to a worker per task.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Listings written per bulk upsert statement.",
+        )
+
+    def read_chunks(self, files, postal_code, chunk_size):
+        for index, path in enumerate(files):
+            try:
+                with open(path) as handle:
+                    listings = _extract_listings(json.load(handle))
+            except (OSError, ValueError) as exc:
+                self.stderr.write(self.style.WARNING(f"Skipping {path}: {exc}"))
+                listings = []
+            self.listing_count += len(listings)
+            # An empty page still yields one chunk so it counts as done.
+            for start in range(0, max(len(listings), 1), chunk_size):
+                # The tag marks a file's final chunk for progress reporting.
+                tag = index if start + chunk_size >= len(listings) else None
+                yield tag, listings[start:start + chunk_size], postal_code
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        chunk_size = options["chunk_size"]
+        batch_size = options["batch_size"]
+        if workers < 1 or chunk_size < 1 or batch_size < 1:
+            raise CommandError("--workers, --chunk-size and --batch-size must be positive.")
+        files = _page_files(options["paths"])
+        verbosity = options["verbosity"]
+
+        started_at = monotonic()
+        self.listing_count = 0
+        files_done = created_count = updated_count = 0
+        pending = {}
+        chunks = self.read_chunks(files, options["postal_code"], chunk_size)
+        for tag, rows in normalize_chunks(chunks, workers):
+            # Later pages win if a listing repeats.
+            pending.update(rows)
+            while len(pending) >= batch_size:
+                batch = {key: pending.pop(key) for key in list(islice(pending, batch_size))}
+                created, updated = _upsert_houses(batch)
+                created_count += created
+                updated_count += updated
+            if tag is not None:
+                files_done += 1
+                if verbosity > 0:
+                    self.stdout.write(format_progress(files_done, len(files), 0, started_at, "pages"))
+        if pending:
+            created, updated = _upsert_houses(pending)
+            created_count += created
+            updated_count += updated
+
+        elapsed = monotonic() - started_at
+        throughput = self.listing_count / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled {created_count + updated_count} listings "
+                f"(created={created_count}, updated={updated_count}) "
+                f"from {len(files)} pages with {workers} workers "
+                f"in {elapsed:.1f}s ({throughput:.1f} listings/sec)."
+            )
+        )
@@ -0,0 +1,159 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from houses.deck import build_deck_queryset
+from houses.models import House
+
+
+BENCHMARK_SOURCE = "benchmark"
+PROPERTY_TYPES = ["single_family", "condos", "townhomes", "multi_family", "land", "mobile"]
+STATUSES = ["for_sale", "ready_to_build"]
+STATES = ["CA", "NV", "OR", "WA", "AZ", "TX", "NY", "FL", "CO", "UT"]
+
+# Deck and saved-list query shapes served by the API.
+QUERIES = {
+    "deck_zip_price": "zip=90005&min_price=400000&max_price=900000",
+    "deck_state_beds": "state=NV&min_beds=4",
+    "deck_type_price": "property_type=condos&max_price=300000",
+    "deck_beds_baths": "min_beds=5&min_baths=4",
+}
+
+
+@contextmanager
+def scratch_database(stdout):
+    """Point the default connection at a throwaway database for the block.
+
+    Benchmarks seed and drop data there instead of touching the configured
+    database; it is destroyed afterwards.
+    """
+    old_name = connection.settings_dict["NAME"]
+    stdout.write("Creating a scratch database for the benchmark.")
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def _synthetic_houses(count, seed):
+    rng = random.Random(seed)
+    now = timezone.now()
+    postal_codes = [f"{90000 + index:05d}" for index in range(500)]
+    for index in range(count):
+        list_date = None if rng.random() < 0.05 else now - timedelta(minutes=rng.randrange(0, 1_000_000))
+        yield House(
+            source=BENCHMARK_SOURCE,
+            external_id=f"bench-{index}",
+            status=rng.choice(STATUSES),
+            property_type=rng.choice(PROPERTY_TYPES),
+            price=rng.randrange(100_000, 3_000_000, 1_000),
+            beds=rng.randint(1, 6),
+            baths=rng.choice([1, 1.5, 2, 2.5, 3, 4, 5]),
+            sqft=rng.randrange(500, 6_000),
+            address_line=f"{index} Benchmark Way",
+            city="Benchmark",
+            state=rng.choice(STATES),
+            postal_code=rng.choice(postal_codes),
+            list_date=list_date,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare deck/saved query plans and latency with and without the House "
+        "filter indexes on synthetic data. Runs in a scratch test database "
+        "(created and destroyed like the test runner's) inside a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--in-place",
+            action="store_true",
+            help=(
+                "Run against the configured database instead of a scratch one. "
+                "Dropping the indexes locks the House table until the benchmark "
+                "rolls back, so never use this on a database serving traffic."
+            ),
+        )
+
+    def queries(self):
+        queries = {
+            name: build_deck_queryset(QueryDict(params)).order_by("id")
+            for name, params in QUERIES.items()
+        }
+        queries["status_recent"] = House.objects.filter(
+            status="for_sale",
+            list_date__isnull=False,
+        ).order_by("-list_date")
+        queries["saved_order"] = House.objects.order_by("-list_date", "-id")
+        return queries
+
+    def measure(self, repeat):
+        results = {}
+        for name, queryset in self.queries().items():
+            page = queryset[:70]
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(page.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(timings), page.explain())
+        return results
+
+    def drop_indexes(self):
+        # Build the DROP statements directly: SQLite's schema editor refuses to
+        # run inside the surrounding atomic block.
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for index in House._meta.indexes:
+                cursor.execute(str(index.remove_sql(House, editor)))
+
+    def report(self, label, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for name, (median_ms, plan) in results.items():
+            self.stdout.write(f"{name}: {median_ms:.2f} ms")
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+
+    def handle(self, *args, **options):
+        if options["in_place"]:
+            self.run(options)
+            return
+
+        with scratch_database(self.stdout):
+            self.run(options)
+
+    def run(self, options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            House.objects.bulk_create(_synthetic_houses(options["rows"], options["seed"]), batch_size=5000)
+            self.stdout.write(
+                f"Seeded {options['rows']} houses in {time.perf_counter() - started:.1f}s."
+            )
+
+            with_indexes = self.measure(options["repeat"])
+            self.drop_indexes()
+            without_indexes = self.measure(options["repeat"])
+
+            self.report("With indexes", with_indexes)
+            self.report("Without indexes", without_indexes)
+            self.stdout.write(self.style.MIGRATE_HEADING("Summary (median ms, indexed vs not)"))
+            for name, (indexed_ms, _) in with_indexes.items():
+                plain_ms = without_indexes[name][0]
+                speedup = plain_ms / indexed_ms if indexed_ms else 0.0
+                self.stdout.write(f"{name}: {indexed_ms:.2f} vs {plain_ms:.2f} ({speedup:.1f}x)")
+
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Benchmark data rolled back."))
@@ -0,0 +1,98 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from houses.management.commands.benchmark_deck_queries import _synthetic_houses, scratch_database
+from houses.models import House
+from houses.renderers import FastJSONRenderer, orjson
+from houses.serializers import HouseSerializer
+
+
+def _model_page(queryset):
+    started = time.perf_counter()
+    houses = list(queryset)
+    fetched = time.perf_counter()
+    body = JSONRenderer().render(HouseSerializer(houses, many=True).data)
+    return fetched - started, time.perf_counter() - fetched, body
+
+
+def _values_page(queryset):
+    started = time.perf_counter()
+    rows = list(queryset.values(*HouseSerializer.Meta.fields))
+    fetched = time.perf_counter()
+    body = FastJSONRenderer().render(rows)
+    return fetched - started, time.perf_counter() - fetched, body
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-page list serialization: HouseSerializer + JSONRenderer "
+        "against .values() rows + FastJSONRenderer. Seeds synthetic houses in a "
+        "scratch database, in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=7000)
+        parser.add_argument("--page-size", type=int, default=70)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--in-place",
+            action="store_true",
+            help="Seed the configured database instead of a scratch one (still rolled back).",
+        )
+
+    def measure(self, page_fn, pages, repeat):
+        fetch_times, encode_times = [], []
+        for _ in range(repeat):
+            for page in pages:
+                fetch, encode, _ = page_fn(page.all())
+                fetch_times.append(fetch * 1000)
+                encode_times.append(encode * 1000)
+        return statistics.median(fetch_times), statistics.median(encode_times)
+
+    def handle(self, *args, **options):
+        if options["in_place"]:
+            self.run(options)
+            return
+
+        with scratch_database(self.stdout):
+            self.run(options)
+
+    def run(self, options):
+        page_size = options["page_size"]
+        with transaction.atomic():
+            House.objects.bulk_create(_synthetic_houses(options["rows"], options["seed"]), batch_size=5000)
+            ids = list(House.objects.order_by("id").values_list("id", flat=True))
+            pages = [
+                House.objects.filter(id__gte=ids[start]).order_by("id")[:page_size]
+                for start in range(0, len(ids), page_size)
+            ]
+
+            # Both paths must produce the same document.
+            _, _, model_body = _model_page(pages[0].all())
+            _, _, values_body = _values_page(pages[0].all())
+            if json.loads(model_body) != json.loads(values_body):
+                self.stderr.write(self.style.WARNING("Fast path output differs from HouseSerializer."))
+
+            results = {
+                "HouseSerializer + JSONRenderer": self.measure(_model_page, pages, options["repeat"]),
+                ".values() + FastJSONRenderer": self.measure(_values_page, pages, options["repeat"]),
+            }
+            transaction.set_rollback(True)
+
+        encoder = "orjson" if orjson is not None else "stdlib json (orjson not installed)"
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{len(pages)} pages of {page_size} houses; fast encoder: {encoder}"))
+        self.stdout.write("Median per page: fetch ms / serialize+encode ms")
+        for label, (fetch_ms, encode_ms) in results.items():
+            self.stdout.write(f"{label}: {fetch_ms:.2f} / {encode_ms:.2f}")
+        (base_fetch, base_encode), (fast_fetch, fast_encode) = results.values()
+        speedup = (base_fetch + base_encode) / (fast_fetch + fast_encode) if fast_fetch + fast_encode else 0.0
+        encode_speedup = base_encode / fast_encode if fast_encode else 0.0
+        self.stdout.write(
+            f"Serialize+encode speedup: {encode_speedup:.1f}x; end-to-end page speedup: {speedup:.1f}x"
+        )
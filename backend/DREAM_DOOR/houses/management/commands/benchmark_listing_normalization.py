@@ -0,0 +1,91 @@
+import os
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from houses.management.commands.backfill_realty_pages import normalize_chunks
+
+
+def _synthetic_listings(count, seed):
+    """Raw list-endpoint listings with the shapes ``_normalize_listing`` handles."""
+    rng = random.Random(seed)
+    listings = []
+    for index in range(count):
+        listings.append({
+            "property_id": f"bench-{index}",
+            "status": rng.choice(["for_sale", "ready_to_build"]),
+            "list_price": f"{rng.randrange(100_000, 3_000_000):,}",
+            "list_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+            "location": {
+                "address": {
+                    "line": f"{rng.randint(1, 9999)} Main St",
+                    "city": "Springfield",
+                    "state_code": "CA",
+                    "postal_code": f"9{rng.randint(0, 9999):04d}",
+                    "coordinate": {"lat": rng.uniform(32, 42), "lon": rng.uniform(-124, -114)},
+                },
+            },
+            "description": {
+                "type": rng.choice(["single_family", "condos", "townhomes"]),
+                "beds": rng.randint(1, 6),
+                "baths": str(rng.choice([1, 1.5, 2, 2.5, 3])),
+                "sqft": f"{rng.randint(600, 6000):,}",
+                "lot_sqft": rng.randint(1000, 20000),
+                "last_sold_date": "2019-06-01",
+            },
+            "primary_photo": {"href": f"https://example.com/{index}s.jpg"},
+        })
+    return listings
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure listing normalization throughput (listings/sec and per core) "
+        "for backfill_realty_pages at increasing worker counts. No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=50_000)
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            help="Worker counts to measure (default: 1, 2, 4, ... up to the CPU count).",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def measure(self, listings, chunk_size, workers):
+        chunks = [
+            (None, listings[start:start + chunk_size], "")
+            for start in range(0, len(listings), chunk_size)
+        ]
+        started = perf_counter()
+        normalized = sum(len(rows) for _, rows in normalize_chunks(iter(chunks), workers))
+        return normalized, perf_counter() - started
+
+    def handle(self, *args, **options):
+        cpus = os.cpu_count() or 1
+        worker_counts = options["workers"]
+        if not worker_counts:
+            worker_counts = []
+            count = 1
+            while count < cpus:
+                worker_counts.append(count)
+                count *= 2
+            worker_counts.append(cpus)
+        listings = _synthetic_listings(options["listings"], options["seed"])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{len(listings)} listings, {cpus} CPUs"))
+        self.stdout.write("workers: listings/sec (per core), speedup over 1 worker")
+        baseline = None
+        for workers in worker_counts:
+            normalized, elapsed = self.measure(listings, options["chunk_size"], workers)
+            rate = normalized / elapsed if elapsed > 0 else 0.0
+            baseline = baseline or rate
+            cores = min(workers, cpus)
+            self.stdout.write(
+                f"{workers}: {rate:,.0f} ({rate / cores:,.0f} per core), "
+                f"{rate / baseline if baseline else 0.0:.2f}x"
+            )
@@ -1,20 +1,74 @@
+import hashlib
 import json
-import os
 from datetime import datetime, time
+from http.client import HTTPException
+from time import monotonic
 from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+from urllib.request import Request
 
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
 
-from houses.models import House, HouseImportError
+from houses.geo import grid_cell
+from houses.jsonstream import iter_json_array
+from houses.models import House, HouseImportError, IngestJob, IngestWatermark
+from houses.realty import (
+    API_HOST,
+    WorkQueue,
+    add_client_arguments,
+    add_job_arguments,
+    api_url,
+    bulk_upsert,
+    client_from_options,
+    fetch_concurrently,
+    finish_job,
+    format_progress,
+    get_api_key,
+    load_job,
+    start_job,
+)
 
 
 STATUS_FILTERS = ["for_sale", "ready_to_build"]
 SORT_BY = {"direction": "desc", "field": "list_date"}
-API_HOST = "realty-in-us.p.rapidapi.com"
-LIST_ENDPOINT = "https://realty-in-us.p.rapidapi.com/properties/v3/list"
+LISTING_PATHS = [
+    ("data", "home_search", "results"),
+    ("data", "home_search", "results", "results"),
+    ("data", "results"),
+    ("data", "properties"),
+    ("data", "listings"),
+    ("results",),
+    ("properties",),
+    ("listings",),
+]
+LIST_PATH = "/properties/v3/list"
+SOURCE = "realty_in_us"
+DEFAULT_BATCH_SIZE = 500
+# Options a resumed job must reuse so stored page offsets stay valid.
+JOB_OPTIONS = ["limit", "max_pages", "incremental"]
+UPSERT_FIELDS = [
+    "status",
+    "property_type",
+    "sub_type",
+    "price",
+    "beds",
+    "baths",
+    "sqft",
+    "lot_sqft",
+    "address_line",
+    "city",
+    "state",
+    "postal_code",
+    "lat",
+    "lng",
+    "geo_cell",
+    "list_date",
+    "last_sold_date",
+    "primary_photo_url",
+    "content_hash",
+    "updated_at",
+]
 
 
 def _get_nested(data, *keys):
@@ -73,17 +127,7 @@ def _parse_list_date(value):
 
 
 def _extract_listings(payload):
-    candidates = [
-        ("data", "home_search", "results"),
-        ("data", "home_search", "results", "results"),
-        ("data", "results"),
-        ("data", "properties"),
-        ("data", "listings"),
-        ("results",),
-        ("properties",),
-        ("listings",),
-    ]
-    for path in candidates:
+    for path in LISTING_PATHS:
         value = _get_nested(payload, *path)
         if isinstance(value, list):
             return value
@@ -171,117 +215,349 @@ def _normalize_listing(listing):
     return normalized
 
 
+def _content_hash(fields):
+    encoded = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def prepare_listing(listing, postal_code=""):
+    """Normalize one raw listing into ``(external_id, House fields)``.
+
+    Returns None for entries that aren't listings. ``postal_code`` fills in
+    listings that omit their own.
+    """
+    if not isinstance(listing, dict):
+        return None
+    normalized = _normalize_listing(listing)
+    if not normalized:
+        return None
+    if not normalized.get("postal_code"):
+        normalized["postal_code"] = postal_code
+    external_id = normalized.pop("external_id")
+    normalized["content_hash"] = _content_hash(normalized)
+    return external_id, normalized
+
+
+def _upsert_houses(rows):
+    """Insert or update ``rows`` (external_id -> House fields) as one batch.
+
+    Returns ``(created, updated)`` counts.
+    """
+    houses = [
+        House(source=SOURCE, external_id=external_id, geo_cell=grid_cell(fields["lat"], fields["lng"]), **fields)
+        for external_id, fields in rows.items()
+    ]
+    updated = bulk_upsert(House, houses, ["source", "external_id"], UPSERT_FIELDS)
+    return len(houses) - updated, updated
+
+
+def _read_zip_file(path):
+    try:
+        with open(path) as handle:
+            content = handle.read()
+    except OSError as exc:
+        raise CommandError(f"Could not read ZIP file {path}: {exc}")
+    return [value.strip() for value in content.replace(",", "\n").splitlines() if value.strip()]
+
+
 class Command(BaseCommand):
     help = "Ingest listings from Realty in US and upsert into House."
 
+    @property
+    def command_name(self):
+        return self.__module__.rsplit(".", 1)[-1]
+
     def add_arguments(self, parser):
-        parser.add_argument("--zip", dest="postal_code", required=True)
-        parser.add_argument("--limit", type=int, default=200)
+        parser.add_argument("--zip", dest="postal_codes", nargs="+", default=[])
+        parser.add_argument("--zip-file", help="File of ZIP codes, one per line or comma separated.")
+        parser.add_argument("--limit", type=int, default=200, help="Listings per page.")
         parser.add_argument("--offset", type=int, default=0)
+        parser.add_argument("--max-pages", type=int, help="Stop each ZIP after this many pages.")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Stop paging at the stored list_date watermark and skip unchanged listings.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Listings written per bulk upsert statement.",
+        )
+        add_job_arguments(parser)
+        add_client_arguments(parser)
 
-    def handle(self, *args, **options):
-        api_key = os.environ.get("REALTY_RAPIDAPI_KEY")
-        if not api_key:
-            raise CommandError("Missing REALTY_RAPIDAPI_KEY environment variable.")
-
+    def build_request(self, postal_code, offset, limit, headers):
         payload = {
-            "limit": options["limit"],
-            "offset": options["offset"],
-            "postal_code": options["postal_code"],
+            "limit": limit,
+            "offset": offset,
+            "postal_code": postal_code,
             "status": STATUS_FILTERS,
             "sort": SORT_BY,
         }
-        headers = {
-            "Content-Type": "application/json",
-            "x-rapidapi-host": API_HOST,
-            "x-rapidapi-key": api_key,
-        }
-
-        request = Request(
-            LIST_ENDPOINT,
+        return Request(
+            api_url(LIST_PATH),
             data=json.dumps(payload).encode("utf-8"),
             headers=headers,
             method="POST",
         )
 
-        try:
-            with urlopen(request, timeout=30) as response:
-                raw_body = response.read().decode("utf-8")
-        except HTTPError as exc:
-            error_message = f"Realty API error {exc.code}: {exc.read().decode('utf-8')}"
-            HouseImportError.objects.create(
-                import_type="list",
-                error_message=error_message,
-            )
-            self.stderr.write(
-                self.style.WARNING(
-                    error_message
+    def describe_error(self, postal_code, offset, exc):
+        context = f"for ZIP {postal_code} offset {offset}"
+        if isinstance(exc, HTTPError):
+            return f"Realty API error {exc.code} {context}: {exc.read().decode('utf-8')}"
+        if isinstance(exc, URLError):
+            return f"Network error {context}: {exc}"
+        if isinstance(exc, json.JSONDecodeError):
+            return f"Invalid JSON response {context}: {exc}"
+        return f"Unexpected error {context}: {exc}"
+
+    def buffer_listings(self, listings, postal_code):
+        """Queue ``listings`` for upsert.
+
+        ``listings`` may be a lazy iterator; returns the number of listings
+        consumed and their parsed list dates.
+        """
+        count = 0
+        list_dates = []
+        for listing in listings:
+            count += 1
+            prepared = prepare_listing(listing, postal_code)
+            if prepared is None:
+                continue
+            external_id, normalized = prepared
+            if normalized["list_date"]:
+                list_dates.append(normalized["list_date"])
+            # Later pages win if the API repeats a listing.
+            self.pending[external_id] = normalized
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        return count, list_dates
+
+    def flush(self):
+        self.write_pending()
+        self.save_checkpoint()
+
+    def save_checkpoint(self):
+        # Only pages whose listings were fully buffered before this flush are
+        # recorded, so a resume never skips listings that were not written.
+        for postal_code, cursor in self.buffered_cursors.items():
+            if cursor is None:
+                self.cursors.pop(postal_code, None)
+            else:
+                self.cursors[postal_code] = cursor
+        self.buffered_cursors = {}
+        self.job.checkpoint = {"pages": self.cursors}
+        self.job.processed_count = self.job.total_count - len(self.cursors)
+        self.job.save(update_fields=["checkpoint", "processed_count", "updated_at"])
+        if self.verbosity > 0:
+            self.stdout.write(
+                format_progress(
+                    self.job.processed_count,
+                    self.job.total_count,
+                    self.started_done,
+                    self.started_at,
+                    "ZIPs",
                 )
             )
+
+    def write_pending(self):
+        if not self.pending:
             return
-        except URLError as exc:
-            error_message = f"Network error: {exc}"
-            HouseImportError.objects.create(
-                import_type="list",
-                error_message=error_message,
+        rows = self.pending
+        if self.incremental:
+            hashes = dict(
+                House.objects.filter(source=SOURCE, external_id__in=list(rows)).values_list(
+                    "external_id", "content_hash"
+                )
             )
-            self.stderr.write(self.style.WARNING(error_message))
-            return
-        except Exception as exc:
-            error_message = f"Unexpected error: {exc}"
-            HouseImportError.objects.create(
-                import_type="list",
-                error_message=error_message,
+            rows = {
+                external_id: fields
+                for external_id, fields in rows.items()
+                if hashes.get(external_id) != fields["content_hash"]
+            }
+            self.unchanged_count += len(self.pending) - len(rows)
+        if rows:
+            created, updated = _upsert_houses(rows)
+            self.created_count += created
+            self.updated_count += updated
+        if self.verbosity > 1:
+            for external_id in rows:
+                self.stdout.write(f"successfully imported ids for property_id: {external_id}")
+        self.pending = {}
+
+    def save_watermarks(self, newest, watermarks, complete_postal_codes):
+        """Advance watermarks for ZIPs paged from the top down to a known end.
+
+        A ZIP that started past offset 0 or stopped at ``--max-pages`` has
+        unseen listings between its pages and the old watermark, so an
+        incremental run must not treat them as already ingested.
+        """
+        rows = [
+            IngestWatermark(
+                source=SOURCE,
+                postal_code=postal_code,
+                list_date=max(filter(None, [list_date, watermarks.get(postal_code)])),
             )
-            self.stderr.write(self.style.WARNING(error_message))
-            return
+            for postal_code, list_date in newest.items()
+            if postal_code in complete_postal_codes
+        ]
+        bulk_upsert(IngestWatermark, rows, ["source", "postal_code"], ["list_date", "updated_at"])
+
+    def start_job(self, options):
+        postal_codes = list(options["postal_codes"])
+        if options.get("zip_file"):
+            postal_codes.extend(_read_zip_file(options["zip_file"]))
+        postal_codes = list(dict.fromkeys(postal_codes))
+        if not postal_codes:
+            raise CommandError("Provide at least one ZIP code with --zip or --zip-file.")
+        job_options = {key: options.get(key) for key in JOB_OPTIONS}
+        cursors = {postal_code: [options["offset"], 1] for postal_code in postal_codes}
+        return start_job(self.command_name, job_options, postal_codes, {"pages": cursors})
 
-        try:
-            payload = json.loads(raw_body)
-        except json.JSONDecodeError as exc:
-            error_message = f"Invalid JSON response: {exc}"
-            HouseImportError.objects.create(
-                import_type="list",
-                error_message=error_message,
-            )
-            self.stderr.write(self.style.WARNING(error_message))
-            return
-
-        listings = _extract_listings(payload)
-        if not listings:
-            self.stdout.write(self.style.WARNING("No listings found in API response."))
-            return
-        self.stdout.write(f"Fetched {len(listings)} listings from API.")
-
-        created_count = 0
-        updated_count = 0
+    def handle(self, *args, **options):
+        api_key = get_api_key()
+
+        if options.get("resume"):
+            self.job = load_job(options["resume"], self.command_name)
+            # Page offsets in the checkpoint only make sense with the original paging options.
+            options.update(self.job.options)
+        else:
+            self.job = self.start_job(options)
+        self.stdout.write(f"Ingest job {self.job.id}: {self.job.total_count} ZIPs.")
+        postal_codes = self.job.items
+        self.cursors = dict(self.job.checkpoint.get("pages", {}))
+        self.buffered_cursors = {}
+        self.started_done = self.job.processed_count
+        self.started_at = monotonic()
+
+        limit = options["limit"]
+        max_pages = options.get("max_pages")
+        headers = {
+            "Content-Type": "application/json",
+            "x-rapidapi-host": API_HOST,
+            "x-rapidapi-key": api_key,
+        }
+        client = client_from_options(options)
+
+        def fetch(page):
+            # Only the connection is opened on the worker; the body is parsed
+            # incrementally on the main thread as it is written.
+            postal_code, offset, _ = page
+            return client.stream(self.build_request(postal_code, offset, limit, headers))
+
+        # Pages within a ZIP are discovered one at a time (we only know there is
+        # another page once this one comes back full); ZIPs run in parallel.
+        queue = WorkQueue(
+            (postal_code, offset, page_number)
+            for postal_code, (offset, page_number) in self.cursors.items()
+        )
 
-        for listing in listings:
-            if not isinstance(listing, dict):
+        self.verbosity = options["verbosity"]
+        self.batch_size = max(1, options["batch_size"])
+        self.incremental = options["incremental"]
+        self.pending = {}
+        self.created_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        page_count = 0
+
+        watermarks = dict(
+            IngestWatermark.objects.filter(source=SOURCE, postal_code__in=postal_codes).values_list(
+                "postal_code", "list_date"
+            )
+        )
+        newest = {}
+        failed_postal_codes = set()
+        # ZIPs whose first page (offset 0) was read in this run, and ZIPs
+        # whose paging ended on a short page or at the watermark.
+        paged_from_top = set()
+        paged_to_end = set()
+
+        for (postal_code, offset, page_number), response, error in fetch_concurrently(
+            queue,
+            fetch,
+            concurrency=options.get("concurrency"),
+        ):
+            if error is None:
+                try:
+                    with response:
+                        listing_count, list_dates = self.buffer_listings(
+                            iter_json_array(response, LISTING_PATHS),
+                            postal_code,
+                        )
+                except (ValueError, OSError, HTTPException) as exc:
+                    error = exc
+            if error is not None:
+                error_message = self.describe_error(postal_code, offset, error)
+                HouseImportError.objects.create(
+                    import_type="list",
+                    error_message=error_message,
+                )
+                self.stderr.write(self.style.WARNING(error_message))
+                failed_postal_codes.add(postal_code)
                 continue
-            normalized = _normalize_listing(listing)
-            if not normalized:
+
+            page_count += 1
+            if offset == 0:
+                paged_from_top.add(postal_code)
+            if not listing_count:
+                self.buffered_cursors[postal_code] = None
+                paged_to_end.add(postal_code)
+                if page_number == 1:
+                    self.stdout.write(
+                        self.style.WARNING(f"No listings found in API response for ZIP {postal_code}.")
+                    )
                 continue
-            if not normalized.get("postal_code"):
-                normalized["postal_code"] = options["postal_code"]
-            external_id = normalized.pop("external_id")
-            house, created = House.objects.update_or_create(
-                source="realty_in_us",
-                external_id=external_id,
-                defaults=normalized,
+            self.stdout.write(
+                f"Fetched {listing_count} listings from API for ZIP {postal_code} (offset {offset})."
             )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-            self.stdout.write(f"successfully imported ids for property_id: {external_id}")
 
+            if list_dates:
+                newest[postal_code] = max(filter(None, [newest.get(postal_code), *list_dates]))
+
+            # Results are sorted by list_date desc, so once a page dips below
+            # the watermark everything after it was seen on a previous run.
+            watermark = watermarks.get(postal_code) if self.incremental else None
+            reached_watermark = bool(watermark and list_dates and min(list_dates) < watermark)
+            if (
+                listing_count >= limit
+                and (not max_pages or page_number < max_pages)
+                and not reached_watermark
+            ):
+                queue.put((postal_code, offset + limit, page_number + 1))
+                self.buffered_cursors[postal_code] = [offset + limit, page_number + 1]
+            else:
+                self.buffered_cursors[postal_code] = None
+                if listing_count < limit or reached_watermark:
+                    paged_to_end.add(postal_code)
+
+        self.flush()
+        self.save_watermarks(newest, watermarks, (paged_from_top & paged_to_end) - failed_postal_codes)
+        if self.cursors:
+            finish_job(self.job, IngestJob.STATUS_HALTED)
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(self.cursors)} ZIPs did not finish. Resume with --resume {self.job.id}."
+                )
+            )
+        else:
+            finish_job(self.job, IngestJob.STATUS_COMPLETED)
+        elapsed = monotonic() - self.started_at
+        created_count = self.created_count
+        updated_count = self.updated_count
         if created_count == 0 and updated_count == 0:
             self.stdout.write(self.style.WARNING("No records were created or updated."))
 
+        ingested = created_count + updated_count
+        throughput = ingested / elapsed if elapsed > 0 else 0.0
         self.stdout.write(
             self.style.SUCCESS(
-                f"Ingested {created_count + updated_count} listings "
-                f"(created={created_count}, updated={updated_count})."
+                f"Ingested {ingested} listings "
+                f"(created={created_count}, updated={updated_count}, "
+                f"unchanged={self.unchanged_count}) "
+                f"from {page_count} pages across {len(postal_codes)} ZIPs "
+                f"in {elapsed:.1f}s ({throughput:.1f} listings/sec)."
             )
         )
@@ -1,16 +1,9 @@
-import json
-import os
-from urllib.error import HTTPError, URLError
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from houses.models import HouseDetail
+from houses.projection import PRESETS, project
+from houses.realty import HouseFetchCommand
 
-from django.core.management.base import BaseCommand, CommandError
 
-from houses.models import House, HouseDetail, HouseImportError
-
-
-API_HOST = "realty-in-us.p.rapidapi.com"
-DETAIL_ENDPOINT = "https://realty-in-us.p.rapidapi.com/properties/v3/detail"
+DETAIL_PATH = "/properties/v3/detail"
 
 
 def _extract_detail(payload):
@@ -21,130 +14,21 @@ def _extract_detail(payload):
     return payload
 
 
-class Command(BaseCommand):
+class Command(HouseFetchCommand):
     help = "Fetch property details from Realty in US and store in HouseDetail."
 
-    def add_arguments(self, parser):
-        parser.add_argument("--house-id", type=int)
-        parser.add_argument("--limit", type=int)
-
-    def handle(self, *args, **options):
-        api_key = os.environ.get("REALTY_RAPIDAPI_KEY")
-        if not api_key:
-            raise CommandError("Missing REALTY_RAPIDAPI_KEY environment variable.")
-
-        qs = House.objects.filter(source="realty_in_us").order_by("id")
-        if options.get("house_id"):
-            qs = qs.filter(id=options["house_id"])
-        if options.get("limit"):
-            qs = qs[: options["limit"]]
-
-        houses = list(qs)
-        if not houses:
-            self.stdout.write(self.style.WARNING("No houses found for detail fetch."))
-            return
-
-        headers = {
-            "x-rapidapi-host": API_HOST,
-            "x-rapidapi-key": api_key,
-        }
-
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-
-        aborted = False
-        for idx, house in enumerate(houses):
-            if not house.external_id:
-                continue
-            query = urlencode({"property_id": house.external_id})
-            url = f"{DETAIL_ENDPOINT}?{query}"
-            request = Request(url, headers=headers, method="GET")
-
-            try:
-                with urlopen(request, timeout=30) as response:
-                    raw_body = response.read().decode("utf-8")
-            except HTTPError as exc:
-                error_message = f"Realty API error {exc.code} for house {house.id}: {exc.read().decode('utf-8')}"
-                remaining = houses[idx:]
-                for remaining_house in remaining:
-                    HouseImportError.objects.create(
-                        house=remaining_house,
-                        external_id=remaining_house.external_id or "",
-                        import_type="details",
-                        error_message=error_message,
-                    )
-                error_count += len(remaining)
-                remaining_ids = [str(item.id) for item in remaining]
-                self.stderr.write(self.style.WARNING(error_message))
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Import halted. Remaining house IDs: {', '.join(remaining_ids)}"
-                    )
-                )
-                aborted = True
-                break
-            except URLError as exc:
-                error_message = f"Network error for house {house.id}: {exc}"
-                remaining = houses[idx:]
-                for remaining_house in remaining:
-                    HouseImportError.objects.create(
-                        house=remaining_house,
-                        external_id=remaining_house.external_id or "",
-                        import_type="details",
-                        error_message=error_message,
-                    )
-                error_count += len(remaining)
-                remaining_ids = [str(item.id) for item in remaining]
-                self.stderr.write(self.style.WARNING(error_message))
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Import halted. Remaining house IDs: {', '.join(remaining_ids)}"
-                    )
-                )
-                aborted = True
-                break
-
-            try:
-                payload = json.loads(raw_body)
-            except json.JSONDecodeError as exc:
-                error_message = f"Invalid JSON for house {house.id}: {exc}"
-                remaining = houses[idx:]
-                for remaining_house in remaining:
-                    HouseImportError.objects.create(
-                        house=remaining_house,
-                        external_id=remaining_house.external_id or "",
-                        import_type="details",
-                        error_message=error_message,
-                    )
-                error_count += len(remaining)
-                remaining_ids = [str(item.id) for item in remaining]
-                self.stderr.write(self.style.WARNING(error_message))
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Import halted. Remaining house IDs: {', '.join(remaining_ids)}"
-                    )
-                )
-                aborted = True
-                break
-
-            detail_payload = _extract_detail(payload)
-            _, created = HouseDetail.objects.update_or_create(
-                house=house,
-                defaults={"payload": detail_payload or {}},
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-            self.stdout.write(f"successfully imported details for property_id: {house.external_id}")
-
-        if aborted:
-            return
-
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Fetched detail for {created_count + updated_count} houses "
-                f"(created={created_count}, updated={updated_count}, errors={error_count})."
-            )
-        )
+    model = HouseDetail
+    related_name = "detail"
+    default_payload = dict
+    endpoint_path = DETAIL_PATH
+    import_type = "details"
+    fetch_label = "detail"
+    summary_label = "detail"
+    update_fields = ["payload", "card_payload", "fetched_at"]
+
+    def extract_payload(self, payload):
+        return _extract_detail(payload)
+
+    def build_row(self, house, payload):
+        payload = payload or {}
+        return HouseDetail(house=house, payload=payload, card_payload=project(payload, PRESETS["card"]))
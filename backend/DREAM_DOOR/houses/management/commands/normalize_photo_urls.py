@@ -1,35 +1,104 @@
-import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
 
+from houses.cache import invalidate_payloads
 from houses.models import HousePhoto
+from houses.photos import normalize_photo
+from houses.realty import format_progress, setup_worker
+
+
+DEFAULT_BATCH_SIZE = 1000
+# Id ranges per worker, so progress updates arrive while workers run.
+PARTITIONS_PER_WORKER = 4
+
+
+def _href_changes(payload, normalized):
+    changes = []
+    for original, updated_photo in zip(payload, normalized):
+        if not isinstance(original, dict) or not isinstance(updated_photo, dict):
+            continue
+        original_href = original.get("href")
+        updated_href = updated_photo.get("href")
+        if original_href and updated_href and original_href != updated_href:
+            changes.append((original_href, updated_href, updated_photo.get("href_fallback")))
+    return changes
+
+
+def normalize_chunks(first_id, last_id, batch_size, limit=None, dry_run=False):
+    """Normalize HousePhoto rows with ``first_id <= id <= last_id``.
+
+    Walks the range by keyset on id, ``batch_size`` rows per query, and
+    writes each chunk's changed rows with one ``bulk_update`` in its own
+    transaction. Yields ``(scanned, updated, reports)`` per chunk, where
+    ``reports`` lists dry-run changes as ``(photo_id, house_id, external_id,
+    changes)``.
+    """
+    qs = HousePhoto.objects.filter(id__lte=last_id).order_by("id")
+    if dry_run:
+        qs = qs.select_related("house").only("id", "house_id", "payload", "house__external_id")
+    else:
+        qs = qs.only("id", "house_id", "payload")
+    cursor = first_id - 1
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        chunk = list(qs.filter(id__gt=cursor)[:size])
+        if not chunk:
+            return
+        cursor = chunk[-1].id
+        if remaining is not None:
+            remaining -= len(chunk)
 
-
-SIZE_EXT_RE = re.compile(r"([a-z])(\.(?:jpg|jpeg|png))$", re.IGNORECASE)
-
-
-def _swap_size(url, size):
-    if not isinstance(url, str):
-        return None
-    match = SIZE_EXT_RE.search(url)
-    if not match:
-        return None
-    return f"{url[:match.start(1)]}{size}{match.group(2)}"
-
-
-def _normalize_photo(photo):
-    if not isinstance(photo, dict):
-        return photo
-    href = photo.get("href")
-    if not href:
-        return photo
-    updated_href = _swap_size(href, "o")
-    if not updated_href:
-        return photo
-    normalized = dict(photo)
-    normalized["href"] = updated_href
-    normalized["href_fallback"] = _swap_size(href, "l")
-    return normalized
+        changed = []
+        reports = []
+        for item in chunk:
+            payload = item.payload or []
+            if not isinstance(payload, list):
+                continue
+            normalized = [normalize_photo(photo) for photo in payload]
+            if normalized == payload:
+                continue
+            if dry_run:
+                changes = _href_changes(payload, normalized)
+                if changes:
+                    external_id = item.house.external_id if item.house_id else "unknown"
+                    reports.append((item.id, item.house_id or "unknown", external_id, changes))
+            item.payload = normalized
+            changed.append(item)
+
+        if changed and not dry_run:
+            # fetched_at is the photos endpoint's ETag/Last-Modified key;
+            # bulk_update skips auto_now, so set it here.
+            now = timezone.now()
+            for item in changed:
+                item.fetched_at = now
+            with transaction.atomic():
+                HousePhoto.objects.bulk_update(changed, ["payload", "fetched_at"])
+            invalidate_payloads("photos", [item.house_id for item in changed])
+        yield len(chunk), len(changed), reports
+
+
+def _normalize_partition(first_id, last_id, batch_size, dry_run):
+    scanned = updated = 0
+    reports = []
+    for chunk_scanned, chunk_updated, chunk_reports in normalize_chunks(
+        first_id, last_id, batch_size, dry_run=dry_run
+    ):
+        scanned += chunk_scanned
+        updated += chunk_updated
+        reports.extend(chunk_reports)
+    connections.close_all()
+    return scanned, updated, reports
+
+
+def _partitions(first_id, last_id, count):
+    step = max(1, -(-(last_id - first_id + 1) // count))
+    return [(start, min(start + step - 1, last_id)) for start in range(first_id, last_id + 1, step)]
 
 
 class Command(BaseCommand):
@@ -38,48 +107,82 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--limit", type=int)
         parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows read and written per transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes normalizing disjoint id ranges in parallel.",
+        )
 
     def handle(self, *args, **options):
-        qs = HousePhoto.objects.select_related("house").order_by("id")
+        self.verbosity = options["verbosity"]
+        batch_size = options["batch_size"]
+        workers = options["workers"]
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers must be positive.")
+        if workers > 1 and options.get("limit"):
+            raise CommandError("--limit cannot be combined with --workers.")
+
+        bounds = HousePhoto.objects.aggregate(first_id=Min("id"), last_id=Max("id"))
+        if bounds["first_id"] is None:
+            self.finish(0, options)
+            return
+        total = HousePhoto.objects.count()
         if options.get("limit"):
-            qs = qs[: options["limit"]]
-
-        updated = 0
-        for item in qs:
-            payload = item.payload or []
-            if not isinstance(payload, list):
-                continue
-
-            normalized = [_normalize_photo(photo) for photo in payload]
-            if normalized == payload:
-                continue
-
-            updated += 1
-            if options.get("dry_run"):
-                changes = []
-                for original, updated_photo in zip(payload, normalized):
-                    if not isinstance(original, dict) or not isinstance(updated_photo, dict):
-                        continue
-                    original_href = original.get("href")
-                    updated_href = updated_photo.get("href")
-                    if original_href and updated_href and original_href != updated_href:
-                        changes.append((original_href, updated_href, updated_photo.get("href_fallback")))
-                if changes:
-                    house_id = item.house_id or "unknown"
-                    external_id = item.house.external_id if item.house_id else "unknown"
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"HousePhoto id={item.id} house_id={house_id} external_id={external_id}:"
-                        )
-                    )
-                    for original_href, updated_href, fallback_href in changes:
-                        self.stdout.write(f"  {original_href} -> {updated_href}")
-                        if fallback_href:
-                            self.stdout.write(f"    fallback: {fallback_href}")
-                continue
-            item.payload = normalized
-            item.save(update_fields=["payload"])
-
+            total = min(total, options["limit"])
+
+        started_at = time.monotonic()
+        done = updated = 0
+        if workers > 1:
+            results = self.run_workers(bounds["first_id"], bounds["last_id"], batch_size, workers, options)
+        else:
+            results = normalize_chunks(
+                bounds["first_id"],
+                bounds["last_id"],
+                batch_size,
+                limit=options.get("limit"),
+                dry_run=options.get("dry_run"),
+            )
+        for scanned, chunk_updated, reports in results:
+            done += scanned
+            updated += chunk_updated
+            self.report(reports)
+            if self.verbosity > 0:
+                self.stdout.write(format_progress(done, total, 0, started_at, "photo rows"))
+
+        self.finish(updated, options)
+
+    def run_workers(self, first_id, last_id, batch_size, workers, options):
+        partitions = _partitions(first_id, last_id, workers * PARTITIONS_PER_WORKER)
+        # Children must open their own connections rather than share ours.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker) as pool:
+            futures = [
+                pool.submit(_normalize_partition, start, end, batch_size, options.get("dry_run"))
+                for start, end in partitions
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def report(self, reports):
+        for photo_id, house_id, external_id, changes in reports:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"HousePhoto id={photo_id} house_id={house_id} external_id={external_id}:"
+                )
+            )
+            for original_href, updated_href, fallback_href in changes:
+                self.stdout.write(f"  {original_href} -> {updated_href}")
+                if fallback_href:
+                    self.stdout.write(f"    fallback: {fallback_href}")
+
+    def finish(self, updated, options):
         if options.get("dry_run"):
             self.stdout.write(self.style.WARNING(f"Dry run complete. Would update {updated} records."))
             return
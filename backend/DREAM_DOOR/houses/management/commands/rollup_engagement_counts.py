@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from houses.engagement import rollup_counters
+from houses.models import House
+
+
+class Command(BaseCommand):
+    help = "Recompute House like/dislike/save counters from the swipe tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--house-id", type=int, action="append")
+
+    def handle(self, *args, **options):
+        qs = House.objects.all()
+        if options["house_id"]:
+            qs = qs.filter(id__in=options["house_id"])
+        updated = rollup_counters(qs)
+        self.stdout.write(self.style.SUCCESS(f"Corrected counters on {updated} houses."))
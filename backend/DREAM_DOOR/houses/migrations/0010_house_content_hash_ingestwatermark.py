@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0009_houseimporterror'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('postal_code', models.CharField(max_length=20)),
+                ('list_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='ingestwatermark',
+            constraint=models.UniqueConstraint(fields=('source', 'postal_code'), name='unique_ingest_watermark_source_postal_code'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0010_house_content_hash_ingestwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(max_length=50)),
+                ('status', models.CharField(default='running', max_length=20)),
+                ('options', models.JSONField(default=dict)),
+                ('items', models.JSONField(default=list)),
+                ('checkpoint', models.JSONField(default=dict)),
+                ('total_count', models.IntegerField(default=0)),
+                ('processed_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
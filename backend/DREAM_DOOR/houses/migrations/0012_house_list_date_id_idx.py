@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0011_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['-list_date', '-id'], name='house_list_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0012_house_list_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['postal_code', 'price'], name='house_postal_code_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['state', 'id'], name='house_state_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['property_type', 'id'], name='house_property_type_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('list_date__isnull', False)), fields=['status', '-list_date'], name='house_status_list_date_idx'),
+        ),
+    ]
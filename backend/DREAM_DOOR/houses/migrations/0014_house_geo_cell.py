@@ -0,0 +1,51 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:50
+
+import math
+
+from django.db import migrations, models
+
+
+# Copied from houses.geo so this migration keeps the grid it was written for.
+CELLS_PER_DEGREE = 10
+GRID_ROWS = 180 * CELLS_PER_DEGREE
+GRID_COLUMNS = 360 * CELLS_PER_DEGREE
+
+
+def grid_cell(lat, lng):
+    if lat is None or lng is None:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    row = min(math.floor((lat + 90) * CELLS_PER_DEGREE), GRID_ROWS - 1)
+    column = min(math.floor((lng + 180) * CELLS_PER_DEGREE), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + column
+
+
+def backfill_geo_cells(apps, schema_editor):
+    House = apps.get_model("houses", "House")
+    batch = []
+    houses = House.objects.filter(lat__isnull=False, lng__isnull=False).only("id", "lat", "lng")
+    for house in houses.iterator(chunk_size=2000):
+        house.geo_cell = grid_cell(house.lat, house.lng)
+        batch.append(house)
+        if len(batch) >= 2000:
+            House.objects.bulk_update(batch, ["geo_cell"])
+            batch = []
+    if batch:
+        House.objects.bulk_update(batch, ["geo_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0013_house_deck_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+    ]
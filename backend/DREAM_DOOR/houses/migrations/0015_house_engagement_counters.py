@@ -0,0 +1,59 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:51
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    House = apps.get_model("houses", "House")
+    counters = {}
+    for model_name, field in [
+        ("HouseLike", "like_count"),
+        ("HouseDislike", "dislike_count"),
+        ("HouseSave", "save_count"),
+    ]:
+        model = apps.get_model("houses", model_name)
+        counts = (
+            model.objects.filter(house=OuterRef("pk"))
+            .order_by()
+            .values("house")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        counters[field] = Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    House.objects.update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0014_house_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='dislike_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='save_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['-like_count', '-id'], name='house_like_count_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['-save_count', '-id'], name='house_save_count_id_idx'),
+        ),
+    ]
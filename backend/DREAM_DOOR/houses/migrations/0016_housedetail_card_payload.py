@@ -0,0 +1,77 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+# Copied from houses.projection so this migration keeps the card fields and
+# projection rules it was written for.
+CARD_FIELDS = [
+    "description.text",
+    "description.beds",
+    "description.baths",
+    "description.sqft",
+    "description.year_built",
+    "description.type",
+    "description.sub_type",
+    "details",
+    "location.address",
+]
+
+
+def _tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        keys = path.split(".")
+        for index, key in enumerate(keys):
+            if key in node and not node[key]:
+                break
+            if index == len(keys) - 1:
+                node[key] = {}
+            else:
+                node = node.setdefault(key, {})
+    return tree
+
+
+def _project(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return None
+    projected = {}
+    for key, subtree in tree.items():
+        if key in value:
+            projected[key] = _project(value[key], subtree)
+    return projected
+
+
+def backfill_card_payloads(apps, schema_editor):
+    HouseDetail = apps.get_model("houses", "HouseDetail")
+    tree = _tree(CARD_FIELDS)
+    batch = []
+    for detail in HouseDetail.objects.only("id", "payload").iterator(chunk_size=500):
+        detail.card_payload = _project(detail.payload, tree)
+        batch.append(detail)
+        if len(batch) >= 500:
+            HouseDetail.objects.bulk_update(batch, ["card_payload"])
+            batch = []
+    if batch:
+        HouseDetail.objects.bulk_update(batch, ["card_payload"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0015_house_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='housedetail',
+            name='card_payload',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(backfill_card_payloads, migrations.RunPython.noop),
+    ]
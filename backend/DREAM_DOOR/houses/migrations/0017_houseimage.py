@@ -0,0 +1,107 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:00
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copied from houses.photos so this migration keeps the URL rules it was
+# written for.
+SIZE_EXT_RE = re.compile(r"([a-z])(\.(?:jpg|jpeg|png))$", re.IGNORECASE)
+SIZE_VARIANTS = {
+    "original_url": "o",
+    "large_url": "l",
+    "medium_url": "m",
+    "small_url": "s",
+}
+
+
+def swap_size(url, size):
+    if not isinstance(url, str):
+        return None
+    match = SIZE_EXT_RE.search(url)
+    if not match:
+        return None
+    return f"{url[:match.start(1)]}{size}{match.group(2)}"
+
+
+def _tag_labels(tags):
+    if not isinstance(tags, list):
+        return []
+    labels = []
+    for tag in tags:
+        label = tag.get("label") if isinstance(tag, dict) else tag
+        if isinstance(label, str) and label:
+            labels.append(label)
+    return labels
+
+
+def photo_rows(payload):
+    if not isinstance(payload, list):
+        return
+    ordinal = 0
+    for photo in payload:
+        href = photo.get("href") if isinstance(photo, dict) else None
+        if not isinstance(href, str) or not href:
+            continue
+        row = {name: swap_size(href, size) or "" for name, size in SIZE_VARIANTS.items()}
+        row["original_url"] = row["original_url"] or href
+        row["ordinal"] = ordinal
+        row["tags"] = _tag_labels(photo.get("tags"))
+        ordinal += 1
+        yield row
+
+
+def replace_images(image_model, payloads):
+    if not payloads:
+        return
+    image_model.objects.filter(house_id__in=list(payloads)).delete()
+    image_model.objects.bulk_create(
+        [
+            image_model(house_id=house_id, **row)
+            for house_id, payload in payloads.items()
+            for row in photo_rows(payload)
+        ],
+        batch_size=500,
+    )
+
+
+def backfill_images(apps, schema_editor):
+    HouseImage = apps.get_model("houses", "HouseImage")
+    HousePhoto = apps.get_model("houses", "HousePhoto")
+    batch = {}
+    for house_id, payload in HousePhoto.objects.values_list("house_id", "payload").iterator(chunk_size=500):
+        batch[house_id] = payload
+        if len(batch) >= 500:
+            replace_images(HouseImage, batch)
+            batch = {}
+    replace_images(HouseImage, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0016_housedetail_card_payload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ordinal', models.PositiveIntegerField()),
+                ('original_url', models.URLField(max_length=500)),
+                ('large_url', models.URLField(blank=True, max_length=500)),
+                ('medium_url', models.URLField(blank=True, max_length=500)),
+                ('small_url', models.URLField(blank=True, max_length=500)),
+                ('tags', models.JSONField(default=list)),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='houses.house')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='houseimage',
+            constraint=models.UniqueConstraint(fields=('house', 'ordinal'), name='unique_house_image_ordinal'),
+        ),
+        migrations.RunPython(backfill_images, migrations.RunPython.noop),
+    ]
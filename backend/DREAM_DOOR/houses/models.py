@@ -1,5 +1,7 @@
 from django.db import models
 
+from houses.geo import grid_cell
+
 
 class House(models.Model):
     source = models.CharField(max_length=50)
@@ -22,11 +24,19 @@ class House(models.Model):
 
     lat = models.FloatField(null=True, blank=True)
     lng = models.FloatField(null=True, blank=True)
+    # Grid cell of (lat, lng) for indexed map searches; see houses.geo.
+    geo_cell = models.IntegerField(null=True, blank=True, db_index=True)
 
     list_date = models.DateTimeField(null=True, blank=True)
     last_sold_date = models.DateField(null=True, blank=True)
 
     primary_photo_url = models.URLField(blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    # Denormalized swipe counts, kept in step by houses.engagement.
+    like_count = models.PositiveIntegerField(default=0)
+    dislike_count = models.PositiveIntegerField(default=0)
+    save_count = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -40,7 +50,32 @@ class House(models.Model):
                 name="unique_house_source_external_id",
             ),
         ]
+        indexes = [
+            # Keyset pagination order for the saved list.
+            models.Index(fields=["-list_date", "-id"], name="house_list_date_id_idx"),
+            # Deck filters. A ZIP is selective enough to range-scan price;
+            # broad filters walk the deck's id order and stop at the page size.
+            models.Index(fields=["postal_code", "price"], name="house_postal_code_price_idx"),
+            models.Index(fields=["state", "id"], name="house_state_id_idx"),
+            models.Index(fields=["property_type", "id"], name="house_property_type_id_idx"),
+            # Popularity rankings.
+            models.Index(fields=["-like_count", "-id"], name="house_like_count_id_idx"),
+            models.Index(fields=["-save_count", "-id"], name="house_save_count_id_idx"),
+            # Newest listings by status; undated listings never need this order.
+            models.Index(
+                fields=["status", "-list_date"],
+                name="house_status_list_date_idx",
+                condition=models.Q(list_date__isnull=False),
+            ),
+        ]
+
 
+    def save(self, *args, **kwargs):
+        self.geo_cell = grid_cell(self.lat, self.lng)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"lat", "lng"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geo_cell"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         price = f"${self.price:,}" if self.price else "$0"
@@ -54,6 +89,8 @@ class HouseDetail(models.Model):
         related_name="detail",
     )
     payload = models.JSONField(default=dict)
+    # The "card" projection of payload (houses.projection), stored at ingest.
+    card_payload = models.JSONField(default=dict)
     fetched_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -73,6 +110,33 @@ class HousePhoto(models.Model):
         return f"Photos → House {self.house_id}"
 
 
+class HouseImage(models.Model):
+    """One photo from HousePhoto.payload with its size variants precomputed."""
+
+    house = models.ForeignKey(
+        House,
+        on_delete=models.CASCADE,
+        related_name="images",
+    )
+    ordinal = models.PositiveIntegerField()
+    original_url = models.URLField(max_length=500)
+    large_url = models.URLField(max_length=500, blank=True)
+    medium_url = models.URLField(max_length=500, blank=True)
+    small_url = models.URLField(max_length=500, blank=True)
+    tags = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["house", "ordinal"],
+                name="unique_house_image_ordinal",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Image {self.ordinal} → House {self.house_id}"
+
+
 class HouseImportError(models.Model):
     house = models.ForeignKey(
         House,
@@ -91,6 +155,43 @@ class HouseImportError(models.Model):
         return f"ImportError ({self.import_type}) → {label}"
 
 
+class IngestWatermark(models.Model):
+    source = models.CharField(max_length=50)
+    postal_code = models.CharField(max_length=20)
+    list_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "postal_code"],
+                name="unique_ingest_watermark_source_postal_code",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Watermark ({self.source}) → {self.postal_code}"
+
+
+class IngestJob(models.Model):
+    STATUS_RUNNING = "running"
+    STATUS_HALTED = "halted"
+    STATUS_COMPLETED = "completed"
+
+    command = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, default=STATUS_RUNNING)
+    options = models.JSONField(default=dict)
+    items = models.JSONField(default=list)
+    checkpoint = models.JSONField(default=dict)
+    total_count = models.IntegerField(default=0)
+    processed_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"IngestJob {self.id} ({self.command}) → {self.status}"
+
+
 class HouseLike(models.Model):
     house = models.ForeignKey(
         House,
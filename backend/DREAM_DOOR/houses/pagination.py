@@ -0,0 +1,202 @@
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowComparison(Func):
+    """``(a, b, ...) <operator> (x, y, ...)`` as a single condition.
+
+    Unlike the equivalent OR of column comparisons, the database can use a
+    row-value comparison as a range scan on a composite index.
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, columns, values, operator):
+        self.operator = operator
+        super().__init__(*columns, *values)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+        half = len(parts) // 2
+        return f"({', '.join(parts[:half])}) {self.operator} ({', '.join(parts[half:])})", params
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only cursor pagination over a composite ``ordering``.
+
+    Each page is a single ``WHERE (ordering) > (cursor) ORDER BY ... LIMIT``
+    query, so there is no ``COUNT(*)`` and no ``OFFSET`` scan. The cursor is
+    the last row's ordering values. NULL sorts above every value (the
+    PostgreSQL default), so a plain descending index matches the order.
+    Requests that pass ``offset`` fall back to ``LimitOffsetPagination`` for
+    older clients.
+    """
+
+    ordering = ("id",)
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        if "offset" in request.query_params:
+            self.legacy = LimitOffsetPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        fields = self.get_fields(queryset.model)
+        self.limit = self.get_limit(request)
+        queryset = queryset.order_by(*self.get_order_by(fields))
+        cursor = self.decode_cursor(request, fields)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(fields, cursor))
+
+        rows = list(queryset[: self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[: self.limit]
+        self.next_position = self.get_position(fields, rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_fields(self, model):
+        fields = []
+        for name in self.ordering:
+            descending = name.startswith("-")
+            fields.append((model._meta.get_field(name.lstrip("-")), descending))
+        return fields
+
+    def get_order_by(self, fields):
+        order_by = []
+        for field, descending in fields:
+            expression = F(field.attname)
+            if descending:
+                order_by.append(expression.desc(nulls_first=True))
+            else:
+                order_by.append(expression.asc(nulls_last=True))
+        return order_by
+
+    def after(self, fields, cursor):
+        """Build the keyset predicate for rows strictly after ``cursor``."""
+        directions = {descending for _, descending in fields}
+        if len(fields) > 1 and len(directions) == 1 and None not in cursor:
+            return self.row_after(fields, cursor, directions.pop())
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(fields, cursor):
+            name = field.attname
+            if value is None:
+                # NULL is the largest value: every non-null follows it when
+                # descending, nothing does when ascending.
+                if descending:
+                    condition |= equal & Q(**{f"{name}__isnull": False})
+                equal &= Q(**{f"{name}__isnull": True})
+                continue
+            if descending:
+                beyond = Q(**{f"{name}__lt": value})
+            else:
+                beyond = Q(**{f"{name}__gt": value})
+                if field.null:
+                    beyond |= Q(**{f"{name}__isnull": True})
+            condition |= equal & beyond
+            equal &= Q(**{name: value})
+        return condition
+
+    def row_after(self, fields, cursor, descending):
+        """``after`` for a non-null cursor over columns sorted one way.
+
+        ``(a, b) < (x, y)`` lets the database start an index range scan at
+        the cursor, where the expanded OR makes it scan from the top.
+        """
+        columns = [F(field.attname) for field, _ in fields]
+        values = [Value(value, output_field=field) for (field, _), value in zip(fields, cursor)]
+        condition = Q(RowComparison(columns, values, "<" if descending else ">"))
+        if not descending:
+            # NULL sorts last ascending but never passes the comparison.
+            equal = Q()
+            for (field, _), value in zip(fields, cursor):
+                if field.null:
+                    condition |= equal & Q(**{f"{field.attname}__isnull": True})
+                equal &= Q(**{field.attname: value})
+        return condition
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(limit, self.max_page_size))
+
+    def get_position(self, fields, row):
+        if isinstance(row, dict):
+            # ``.values()`` rows; value_to_string() reads attributes.
+            row = SimpleNamespace(**row)
+        return [
+            None if getattr(row, field.attname) is None else field.value_to_string(row)
+            for field, _ in fields
+        ]
+
+    def decode_cursor(self, request, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(fields, values)
+            ]
+        except (binascii.Error, UnicodeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+
+class DeckPagination(KeysetPagination):
+    ordering = ("id",)
+
+
+class SavedHousePagination(KeysetPagination):
+    ordering = ("-list_date", "-id")
+
+
+class HouseImagePagination(KeysetPagination):
+    ordering = ("ordinal",)
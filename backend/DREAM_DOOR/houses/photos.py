@@ -0,0 +1,90 @@
+import re
+
+
+# Realty photo URLs end in a one-letter size code before the extension,
+# e.g. ".../abc123s.jpg" (small) or ".../abc123o.jpg" (original).
+SIZE_EXT_RE = re.compile(r"([a-z])(\.(?:jpg|jpeg|png))$", re.IGNORECASE)
+# HouseImage column -> size code.
+SIZE_VARIANTS = {
+    "original_url": "o",
+    "large_url": "l",
+    "medium_url": "m",
+    "small_url": "s",
+}
+
+
+def swap_size(url, size):
+    if not isinstance(url, str):
+        return None
+    match = SIZE_EXT_RE.search(url)
+    if not match:
+        return None
+    return f"{url[:match.start(1)]}{size}{match.group(2)}"
+
+
+def normalize_photo(photo):
+    """Point a payload photo's ``href`` at size 'o' with an 'l' fallback."""
+    if not isinstance(photo, dict):
+        return photo
+    href = photo.get("href")
+    if not href:
+        return photo
+    updated_href = swap_size(href, "o")
+    if not updated_href:
+        return photo
+    normalized = dict(photo)
+    normalized["href"] = updated_href
+    normalized["href_fallback"] = swap_size(href, "l")
+    return normalized
+
+
+def _tag_labels(tags):
+    if not isinstance(tags, list):
+        return []
+    labels = []
+    for tag in tags:
+        label = tag.get("label") if isinstance(tag, dict) else tag
+        if isinstance(label, str) and label:
+            labels.append(label)
+    return labels
+
+
+def photo_rows(payload):
+    """Yield HouseImage field dicts for the photos in a HousePhoto payload.
+
+    Entries without an ``href`` are skipped; ordinals follow the payload
+    order. URLs without a size code keep the ``href`` as the original and
+    leave the other sizes blank.
+    """
+    if not isinstance(payload, list):
+        return
+    ordinal = 0
+    for photo in payload:
+        href = photo.get("href") if isinstance(photo, dict) else None
+        if not isinstance(href, str) or not href:
+            continue
+        row = {name: swap_size(href, size) or "" for name, size in SIZE_VARIANTS.items()}
+        row["original_url"] = row["original_url"] or href
+        row["ordinal"] = ordinal
+        row["tags"] = _tag_labels(photo.get("tags"))
+        ordinal += 1
+        yield row
+
+
+def replace_images(image_model, payloads):
+    """Rebuild ``image_model`` rows from ``{house_id: photos payload}``.
+
+    Costs one DELETE plus batched INSERTs.
+    """
+    if not payloads:
+        return 0
+    image_model.objects.filter(house_id__in=list(payloads)).delete()
+    images = image_model.objects.bulk_create(
+        [
+            image_model(house_id=house_id, **row)
+            for house_id, payload in payloads.items()
+            for row in photo_rows(payload)
+        ],
+        batch_size=500,
+    )
+    return len(images)
@@ -0,0 +1,94 @@
+from rest_framework.exceptions import ValidationError
+
+
+# Named field sets for ``?fields=``. ``None`` means the whole payload.
+PRESETS = {
+    # Everything the app's card and detail screens read.
+    "card": [
+        "description.text",
+        "description.beds",
+        "description.baths",
+        "description.sqft",
+        "description.year_built",
+        "description.type",
+        "description.sub_type",
+        "details",
+        "location.address",
+    ],
+    "full": None,
+}
+MAX_FIELDS = 50
+
+
+def parse_fields(params, name="fields"):
+    """Return the dotted paths requested in ``params[name]``.
+
+    Preset names expand to their paths. Returns None when the whole
+    payload is wanted (no parameter, or the ``full`` preset).
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    paths = []
+    for token in (part.strip() for part in value.split(",")):
+        if not token:
+            continue
+        if token in PRESETS:
+            if PRESETS[token] is None:
+                return None
+            paths.extend(PRESETS[token])
+        elif all(token.split(".")):
+            paths.append(token)
+        else:
+            raise ValidationError({name: f"Invalid field path {token!r}."})
+    if not paths:
+        return None
+    if len(paths) > MAX_FIELDS:
+        raise ValidationError({name: f"Request at most {MAX_FIELDS} fields."})
+    return list(dict.fromkeys(paths))
+
+
+def is_preset(paths, preset):
+    return paths is not None and set(paths) == set(PRESETS[preset])
+
+
+def _tree(paths):
+    # ["a.b", "a.c", "d"] -> {"a": {"b": {}, "c": {}}, "d": {}}; an empty
+    # dict means "keep the whole value".
+    tree = {}
+    for path in paths:
+        node = tree
+        keys = path.split(".")
+        for index, key in enumerate(keys):
+            if key in node and not node[key]:
+                break
+            if index == len(keys) - 1:
+                node[key] = {}
+            else:
+                node = node.setdefault(key, {})
+    return tree
+
+
+def _project(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return None
+    projected = {}
+    for key, subtree in tree.items():
+        if key in value:
+            projected[key] = _project(value[key], subtree)
+    return projected
+
+
+def project(payload, paths):
+    """Keep only ``paths`` (dotted keys) of a JSON payload.
+
+    Lists are projected element by element, so ``photos.href`` keeps the
+    ``href`` of every photo. Missing keys are left out.
+    """
+    if paths is None:
+        return payload
+    return _project(payload, _tree(paths))
@@ -0,0 +1,666 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from django.utils import timezone
+
+from houses.cache import invalidate_payloads
+from houses.models import House, HouseImportError, IngestJob
+
+
+API_HOST = "realty-in-us.p.rapidapi.com"
+DEFAULT_BASE_URL = "https://realty-in-us.p.rapidapi.com"
+REQUEST_TIMEOUT = 30
+
+# Sustained requests/second allowed by our RapidAPI plan.
+DEFAULT_RATE_LIMIT = 5.0
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses that will fail every request in a run: a bad key or plan, or
+# throttling and server errors that outlasted the client's retries.
+FATAL_STATUSES = {401, 403} | RETRY_STATUSES
+DEFAULT_BATCH_SIZE = 100
+# Selection options recorded on an IngestJob for later inspection.
+SELECTION_OPTIONS = ["house_id", "limit", "stale_after", "missing_only", "prioritize"]
+
+
+def api_url(path):
+    # REALTY_API_BASE_URL lets tests and staging point at a stub server.
+    base_url = os.environ.get("REALTY_API_BASE_URL") or DEFAULT_BASE_URL
+    return f"{base_url.rstrip('/')}{path}"
+
+
+def get_api_key():
+    api_key = os.environ.get("REALTY_RAPIDAPI_KEY")
+    if not api_key:
+        raise CommandError("Missing REALTY_RAPIDAPI_KEY environment variable.")
+    return api_key
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every worker of a command.
+
+    ``rate`` is the sustained requests/second; ``burst`` is the bucket size.
+    A rate of ``None`` or ``0`` disables limiting. ``pause`` empties the
+    bucket until the given delay has elapsed, so one 429 slows every worker.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate or 0
+        self.capacity = max(1.0, burst if burst is not None else self.rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = self.clock()
+            if now > self.updated:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            # Reserve a token now; a negative balance is a queue of waiters.
+            self.tokens -= 1
+            delay = self.updated - now
+            if self.tokens < 0:
+                delay += -self.tokens / self.rate
+        if delay > 0:
+            self.sleep(delay)
+
+    def pause(self, delay):
+        with self.lock:
+            resume_at = self.clock() + delay
+            if resume_at > self.updated:
+                self.tokens = min(self.tokens, 0.0)
+                self.updated = resume_at
+
+
+def is_fatal_error(exc):
+    """Whether ``exc`` means the rest of a run would fail too.
+
+    Other errors (a 400/404 for one delisted property, a malformed body)
+    only concern the item that raised them.
+    """
+    if isinstance(exc, HTTPError):
+        return exc.code in FATAL_STATUSES
+    return isinstance(exc, (URLError, TimeoutError, ConnectionError))
+
+
+def _retry_after_seconds(exc):
+    value = exc.headers.get("Retry-After") if exc.headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=dt_timezone.utc)
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RealtyClient:
+    """Rate-limited Realty API client with exponential backoff.
+
+    Retryable failures (429/5xx responses, network errors and timeouts) are
+    retried up to ``max_retries`` times, honoring ``Retry-After`` when the API
+    sends it and otherwise sleeping a full-jitter exponential delay.
+    """
+
+    def __init__(
+        self,
+        rate=DEFAULT_RATE_LIMIT,
+        max_retries=DEFAULT_MAX_RETRIES,
+        timeout=REQUEST_TIMEOUT,
+        sleep=time.sleep,
+    ):
+        self.limiter = RateLimiter(rate, sleep=sleep)
+        self.max_retries = max(0, max_retries)
+        self.timeout = timeout
+        self.sleep = sleep
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    def call(self, action):
+        """Run ``action()`` under the rate limiter, retrying transient failures."""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                return action()
+            except HTTPError as exc:
+                if exc.code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise
+                retry_after = _retry_after_seconds(exc)
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                if exc.code == 429:
+                    self.limiter.pause(delay)
+            except (URLError, TimeoutError, ConnectionError):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+            attempt += 1
+            self.sleep(delay)
+
+    def open(self, request):
+        def read():
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+
+        return self.call(read)
+
+    def stream(self, request):
+        """Return the open response so the caller can parse the body incrementally.
+
+        Only opening the connection is retried; the caller owns the response
+        and must close it.
+        """
+        return self.call(lambda: urlopen(request, timeout=self.timeout))
+
+    def fetch_json(self, request):
+        return json.loads(self.open(request).decode("utf-8"))
+
+
+def add_client_arguments(parser):
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE_LIMIT,
+        help="Maximum sustained API requests per second (0 disables limiting).",
+    )
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+
+
+def client_from_options(options):
+    return RealtyClient(
+        rate=options.get("rate", DEFAULT_RATE_LIMIT),
+        max_retries=options.get("max_retries", DEFAULT_MAX_RETRIES),
+    )
+
+
+class WorkQueue:
+    """FIFO of fetch items that can be extended while it is being consumed.
+
+    Unlike a generator, iteration can resume after the queue runs dry, so a
+    consumer of ``fetch_concurrently`` may enqueue follow-up work (e.g. the
+    next page) from a result and have it picked up on the next submit.
+    """
+
+    def __init__(self, items=()):
+        self.items = deque(items)
+
+    def put(self, item):
+        self.items.append(item)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.items:
+            raise StopIteration
+        return self.items.popleft()
+
+
+def fetch_concurrently(items, fetch, concurrency=1):
+    """Yield ``(item, result, error)`` tuples as each ``fetch(item)`` finishes.
+
+    At most ``concurrency`` fetches are in flight at once. Closing the
+    generator early cancels every fetch that has not started yet.
+    """
+    items = iter(items)
+    concurrency = max(1, concurrency or 1)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = {}
+
+    def submit_next():
+        for item in items:
+            pending[executor.submit(fetch, item)] = item
+            return
+
+    try:
+        for _ in range(concurrency):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result, error = future.result(), None
+                except Exception as exc:
+                    result, error = None, exc
+                yield item, result, error
+                submit_next()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def setup_worker():
+    """ProcessPoolExecutor initializer for workers that use Django.
+
+    A no-op after fork; configures Django under the spawn start method.
+    Close the parent's connections before starting the pool so children
+    never share its sockets.
+    """
+    django.setup()
+
+
+def parse_age(value):
+    """Parse ``30m``/``12h``/``7d`` (bare numbers are hours) into a timedelta."""
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    value = value.strip().lower()
+    unit = units.get(value[-1:])
+    number = value[:-1] if unit else value
+    try:
+        amount = float(number)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid age {value!r}; use e.g. 30m, 12h or 7d.")
+    return timedelta(**{unit or "hours": amount})
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields):
+    """Insert or update ``objs`` in one transaction; return the updated count.
+
+    Uses a single ``INSERT ... ON CONFLICT`` where the database supports it,
+    otherwise ``bulk_create`` for new rows plus ``bulk_update`` for existing
+    ones (matched on ``unique_fields``).
+    """
+    if not objs:
+        return 0
+    attnames = [model._meta.get_field(name).attname for name in unique_fields]
+
+    def key(obj):
+        return tuple(getattr(obj, attname) for attname in attnames)
+
+    lookup = {f"{attname}__in": {getattr(obj, attname) for obj in objs} for attname in attnames}
+    existing = {
+        tuple(row[:-1]): row[-1]
+        for row in model.objects.filter(**lookup).values_list(*attnames, "pk")
+    }
+    updated_count = sum(1 for obj in objs if key(obj) in existing)
+
+    with transaction.atomic():
+        if connection.features.supports_update_conflicts_with_target:
+            model.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+            )
+            return updated_count
+
+        now = timezone.now()
+        auto_now_fields = [
+            field.attname
+            for field in model._meta.concrete_fields
+            if getattr(field, "auto_now", False) and field.name in update_fields
+        ]
+        to_create = []
+        to_update = []
+        for obj in objs:
+            if key(obj) in existing:
+                obj.pk = existing[key(obj)]
+                for attname in auto_now_fields:
+                    setattr(obj, attname, now)
+                to_update.append(obj)
+            else:
+                to_create.append(obj)
+        model.objects.bulk_create(to_create)
+        model.objects.bulk_update(to_update, update_fields)
+    return updated_count
+
+
+def add_job_arguments(parser):
+    parser.add_argument(
+        "--resume",
+        type=int,
+        metavar="JOB_ID",
+        help="Resume a halted IngestJob from its last checkpoint.",
+    )
+
+
+def start_job(command, options, items, checkpoint=None):
+    return IngestJob.objects.create(
+        command=command,
+        options=json.loads(json.dumps(options, default=str)),
+        items=items,
+        checkpoint=checkpoint or {},
+        total_count=len(items),
+    )
+
+
+def load_job(job_id, command):
+    try:
+        job = IngestJob.objects.get(id=job_id, command=command)
+    except IngestJob.DoesNotExist:
+        raise CommandError(f"No {command} job with id {job_id}.")
+    if job.status == IngestJob.STATUS_COMPLETED:
+        raise CommandError(f"Job {job_id} already completed.")
+    job.status = IngestJob.STATUS_RUNNING
+    job.save(update_fields=["status", "updated_at"])
+    return job
+
+
+def finish_job(job, status):
+    job.status = status
+    job.save(update_fields=["status", "updated_at"])
+
+
+def format_progress(done, total, started_done, started_at, label):
+    elapsed = time.monotonic() - started_at
+    rate = (done - started_done) / elapsed if elapsed > 0 else 0.0
+    percent = 100 * done / total if total else 100
+    eta = f"{(total - done) / rate:.0f}s" if rate > 0 else "unknown"
+    return f"Progress: {done}/{total} {label} ({percent:.0f}%), {rate:.1f}/s, ETA {eta}."
+
+
+class JobCheckpoint:
+    """Commit bookkeeping for an IngestJob over an ordered list of item ids.
+
+    ``position`` counts the leading items that are all committed; items that
+    concurrent fetches committed out of order are kept in ``done_ahead``
+    until the gap before them closes.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.position = job.checkpoint.get("position", 0)
+        self.done_ahead = set(job.checkpoint.get("done_ahead", []))
+        self.started_done = job.processed_count
+        self.started_at = time.monotonic()
+
+    def remaining(self):
+        return [item for item in self.job.items[self.position:] if item not in self.done_ahead]
+
+    def commit(self, items):
+        self.done_ahead.update(items)
+        ordered = self.job.items
+        while self.position < len(ordered) and ordered[self.position] in self.done_ahead:
+            self.done_ahead.discard(ordered[self.position])
+            self.position += 1
+        self.job.checkpoint = {"position": self.position, "done_ahead": sorted(self.done_ahead)}
+        self.job.processed_count = self.position + len(self.done_ahead)
+        self.job.save(update_fields=["checkpoint", "processed_count", "updated_at"])
+
+    def progress(self, label):
+        return format_progress(
+            self.job.processed_count,
+            self.job.total_count,
+            self.started_done,
+            self.started_at,
+            label,
+        )
+
+
+class HouseFetchCommand(BaseCommand):
+    """Shared driver for the per-house Realty endpoints (detail, photos).
+
+    Subclasses set ``model``/``endpoint_path``/``import_type`` and implement
+    ``extract_payload``. HTTP requests run on a thread pool; results are
+    buffered on the main thread and written ``--batch-size`` rows at a time.
+    A failure for one house is recorded as a HouseImportError and the run
+    continues; errors that would fail every request (see ``is_fatal_error``)
+    halt the job so it can be resumed.
+    """
+
+    model = None
+    related_name = None
+    default_payload = dict
+    endpoint_path = None
+    import_type = None
+    fetch_label = None
+    summary_label = None
+    # Columns rewritten when a row already exists.
+    update_fields = ["payload", "fetched_at"]
+
+    def add_arguments(self, parser):
+        parser.add_argument("--house-id", type=int)
+        parser.add_argument("--limit", type=int)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows written per bulk upsert transaction.",
+        )
+        selection = parser.add_mutually_exclusive_group()
+        selection.add_argument(
+            "--stale-after",
+            type=parse_age,
+            help="Only refetch houses never fetched or fetched longer ago than this (e.g. 12h, 7d).",
+        )
+        selection.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only fetch houses with no stored payload.",
+        )
+        parser.add_argument(
+            "--prioritize",
+            action="store_true",
+            help="Spend the --limit budget on missing, popular and recently listed houses first.",
+        )
+        add_job_arguments(parser)
+        add_client_arguments(parser)
+
+    @property
+    def command_name(self):
+        return self.__module__.rsplit(".", 1)[-1]
+
+    def extract_payload(self, payload):
+        raise NotImplementedError
+
+    def build_row(self, house, payload):
+        return self.model(house=house, payload=payload or self.default_payload())
+
+    def after_upsert(self, rows):
+        """Hook for writes derived from ``rows``; runs in the upsert's transaction."""
+
+    def flush(self):
+        """Write buffered payloads and checkpoint them; return ``(created, updated)``."""
+        if not self.pending:
+            return 0, 0
+        rows = [self.build_row(house, payload) for house, payload in self.pending]
+        self.pending = []
+        with transaction.atomic():
+            updated = bulk_upsert(self.model, rows, ["house"], self.update_fields)
+            self.after_upsert(rows)
+        invalidate_payloads(self.related_name, [row.house_id for row in rows])
+        self.checkpoint.commit([row.house_id for row in rows])
+        if self.verbosity > 0:
+            self.stdout.write(self.checkpoint.progress("houses"))
+        return len(rows) - updated, updated
+
+    def record_errors(self, houses, error_message):
+        HouseImportError.objects.bulk_create(
+            [
+                HouseImportError(
+                    house=house,
+                    external_id=house.external_id or "",
+                    import_type=self.import_type,
+                    error_message=error_message,
+                )
+                for house in houses
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def get_queryset(self, options):
+        qs = House.objects.filter(source="realty_in_us")
+        if options.get("house_id"):
+            qs = qs.filter(id=options["house_id"])
+
+        missing = Q(**{f"{self.related_name}__isnull": True})
+        if options.get("missing_only"):
+            qs = qs.filter(missing)
+        elif options.get("stale_after"):
+            cutoff = timezone.now() - options["stale_after"]
+            qs = qs.filter(missing | Q(**{f"{self.related_name}__fetched_at__lt": cutoff}))
+
+        if options.get("prioritize"):
+            qs = self.prioritize(qs, missing)
+        else:
+            qs = qs.order_by("id")
+
+        if options.get("limit"):
+            qs = qs[: options["limit"]]
+        return qs
+
+    def prioritize(self, qs, missing):
+        """Order houses by how likely they are to be shown next.
+
+        Houses with no stored payload come first, then the most liked/saved,
+        then the most recently listed.
+        """
+        return qs.annotate(
+            is_missing=Case(When(missing, then=1), default=0, output_field=IntegerField()),
+            engagement=F("like_count") + F("save_count"),
+        ).order_by(
+            "-is_missing",
+            "-engagement",
+            F("list_date").desc(nulls_last=True),
+            "id",
+        )
+
+    def build_request(self, house, headers):
+        query = urlencode({"property_id": house.external_id})
+        url = f"{api_url(self.endpoint_path)}?{query}"
+        return Request(url, headers=headers, method="GET")
+
+    def describe_error(self, house, exc):
+        if isinstance(exc, HTTPError):
+            return f"Realty API error {exc.code} for house {house.id}: {exc.read().decode('utf-8')}"
+        if isinstance(exc, URLError):
+            return f"Network error for house {house.id}: {exc}"
+        if isinstance(exc, json.JSONDecodeError):
+            return f"Invalid JSON for house {house.id}: {exc}"
+        return f"Unexpected error for house {house.id}: {exc}"
+
+    def start_job(self, options):
+        houses = list(self.get_queryset(options))
+        if not houses:
+            return None, []
+        job_options = {key: options.get(key) for key in SELECTION_OPTIONS}
+        job = start_job(self.command_name, job_options, [house.id for house in houses])
+        return job, houses
+
+    def resume_job(self, job_id):
+        job = load_job(job_id, self.command_name)
+        remaining = JobCheckpoint(job).remaining()
+        houses_by_id = House.objects.in_bulk(remaining)
+        return job, [houses_by_id[house_id] for house_id in remaining if house_id in houses_by_id]
+
+    def handle(self, *args, **options):
+        api_key = get_api_key()
+
+        if options.get("resume"):
+            job, houses = self.resume_job(options["resume"])
+        else:
+            job, houses = self.start_job(options)
+        if not houses:
+            if job is not None:
+                finish_job(job, IngestJob.STATUS_COMPLETED)
+            self.stdout.write(self.style.WARNING(f"No houses found for {self.fetch_label} fetch."))
+            return
+        self.stdout.write(f"Ingest job {job.id}: {len(houses)} houses to fetch.")
+        self.checkpoint = JobCheckpoint(job)
+
+        headers = {
+            "x-rapidapi-host": API_HOST,
+            "x-rapidapi-key": api_key,
+        }
+
+        client = client_from_options(options)
+
+        def fetch(house):
+            return client.fetch_json(self.build_request(house, headers))
+
+        self.verbosity = options.get("verbosity", 1)
+        self.batch_size = max(1, options.get("batch_size") or DEFAULT_BATCH_SIZE)
+        self.pending = []
+        created_count = 0
+        updated_count = 0
+        error_count = 0
+
+        done_ids = {house.id for house in houses if not house.external_id}
+        if done_ids:
+            self.checkpoint.commit(done_ids)
+        results = fetch_concurrently(
+            [house for house in houses if house.id not in done_ids],
+            fetch,
+            concurrency=options.get("concurrency"),
+        )
+        for house, payload, error in results:
+            if error is not None and not is_fatal_error(error):
+                # Only this house failed: record it and keep going. It is
+                # checkpointed as done so a resume doesn't refetch it.
+                error_message = self.describe_error(house, error)
+                self.record_errors([house], error_message)
+                self.stderr.write(self.style.WARNING(error_message))
+                error_count += 1
+                done_ids.add(house.id)
+                self.checkpoint.commit([house.id])
+                continue
+            if error is not None:
+                results.close()
+                created, updated = self.flush()
+                created_count += created
+                updated_count += updated
+                error_message = self.describe_error(house, error)
+                remaining = [item for item in houses if item.id not in done_ids]
+                self.record_errors(remaining, error_message)
+                error_count += len(remaining)
+                remaining_ids = [str(item.id) for item in remaining]
+                self.stderr.write(self.style.WARNING(error_message))
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Import halted. Remaining house IDs: {', '.join(remaining_ids)}"
+                    )
+                )
+                finish_job(job, IngestJob.STATUS_HALTED)
+                self.stdout.write(self.style.WARNING(f"Resume with --resume {job.id}."))
+                return
+
+            self.pending.append((house, self.extract_payload(payload)))
+            done_ids.add(house.id)
+            self.stdout.write(
+                f"successfully imported {self.import_type} for property_id: {house.external_id}"
+            )
+            if len(self.pending) >= self.batch_size:
+                created, updated = self.flush()
+                created_count += created
+                updated_count += updated
+
+        created, updated = self.flush()
+        created_count += created
+        updated_count += updated
+        finish_job(job, IngestJob.STATUS_COMPLETED)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fetched {self.summary_label} for {created_count + updated_count} houses "
+                f"(created={created_count}, updated={updated_count}, errors={error_count})."
+            )
+        )
@@ -1,5 +1,8 @@
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
-from houses.models import House
+from houses.models import House, HouseImage
+from houses.projection import is_preset, project
+from houses.swipes import ACTIONS
 
 
 class HouseSerializer(serializers.ModelSerializer):
@@ -22,4 +25,64 @@ class HouseSerializer(serializers.ModelSerializer):
             "property_type",
             "sub_type",
             "primary_photo_url",
+            "like_count",
+            "dislike_count",
+            "save_count",
         ]
+        read_only_fields = ["like_count", "dislike_count", "save_count"]
+
+
+class HouseImageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HouseImage
+        fields = [
+            "ordinal",
+            "original_url",
+            "large_url",
+            "medium_url",
+            "small_url",
+            "tags",
+        ]
+
+
+class HouseBundleSerializer(HouseSerializer):
+    """House card fields plus the stored detail and photo payloads.
+
+    Expects a queryset with ``select_related("detail", "photos")``; a
+    missing payload serializes as null. ``context["detail_fields"]`` holds
+    dotted paths (see ``houses.projection``) to trim the detail payload.
+    """
+
+    detail = serializers.SerializerMethodField()
+    photos = serializers.SerializerMethodField()
+
+    class Meta(HouseSerializer.Meta):
+        fields = HouseSerializer.Meta.fields + ["detail", "photos"]
+
+    def _related(self, house, relation):
+        try:
+            return getattr(house, relation)
+        except ObjectDoesNotExist:
+            return None
+
+    def get_detail(self, house):
+        detail = self._related(house, "detail")
+        if detail is None:
+            return None
+        fields = self.context.get("detail_fields")
+        if is_preset(fields, "card"):
+            return detail.card_payload
+        return project(detail.payload, fields)
+
+    def get_photos(self, house):
+        photos = self._related(house, "photos")
+        return None if photos is None else photos.payload
+
+
+class SwipeEventSerializer(serializers.Serializer):
+    house_id = serializers.IntegerField(min_value=1)
+    action = serializers.ChoiceField(choices=sorted(ACTIONS))
+
+
+class SwipeBatchSerializer(serializers.Serializer):
+    swipes = SwipeEventSerializer(many=True, allow_empty=False, max_length=500)
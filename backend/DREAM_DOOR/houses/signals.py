@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from houses.cache import invalidate_payloads
+from houses.models import HouseDetail, HouseImage, HousePhoto
+from houses.photos import replace_images
+
+
+# Single-row writes (admin, shell, .save() callers). Bulk writes in the
+# ingest commands do the same work explicitly.
+@receiver(post_save, sender=HouseDetail)
+@receiver(post_delete, sender=HouseDetail)
+def detail_changed(sender, instance, **kwargs):
+    invalidate_payloads("detail", [instance.house_id])
+
+
+@receiver(post_save, sender=HousePhoto)
+@receiver(post_delete, sender=HousePhoto)
+def photos_changed(sender, instance, **kwargs):
+    invalidate_payloads("photos", [instance.house_id])
+
+
+@receiver(post_save, sender=HousePhoto)
+def photos_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        replace_images(HouseImage, {instance.house_id: instance.payload})
+
+
+@receiver(post_delete, sender=HousePhoto)
+def photos_deleted(sender, instance, **kwargs):
+    HouseImage.objects.filter(house_id=instance.house_id).delete()
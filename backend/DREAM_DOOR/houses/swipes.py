@@ -0,0 +1,144 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from houses.engagement import adjust_counters
+from houses.models import House, HouseDislike, HouseLike, HouseSave
+
+
+logger = logging.getLogger(__name__)
+
+
+# Swipe action -> model recording it.
+ACTIONS = {
+    "like": HouseLike,
+    "dislike": HouseDislike,
+    "save": HouseSave,
+}
+
+
+def write_swipes(events):
+    """Insert ``(action, house_id)`` events and bump the counters in one transaction.
+
+    The events' houses are locked first. Each model then gets one
+    ``bulk_create`` and one counter UPDATE. Events for houses that no longer
+    exist are dropped, and saves of houses that are already saved are
+    skipped. Returns the number of events written.
+    """
+    by_model = {model: [] for model in ACTIONS.values()}
+    with transaction.atomic():
+        # Houses can be deleted while their events wait in the buffer; one
+        # dangling id would fail the whole insert, so recheck at write time.
+        existing = set(
+            House.objects.select_for_update()
+            .filter(id__in={house_id for _, house_id in events})
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        for action, house_id in events:
+            if house_id in existing:
+                by_model[ACTIONS[action]].append(house_id)
+        if by_model[HouseSave]:
+            # Read after the lock: a concurrent /save/ has either committed
+            # and shows up here, or waits for this batch. Otherwise its row
+            # would be skipped by the insert but still counted.
+            saved = HouseSave.objects.filter(house_id__in=by_model[HouseSave]).values_list("house_id", flat=True)
+            by_model[HouseSave] = list(set(by_model[HouseSave]) - set(saved))
+
+        for model, house_ids in by_model.items():
+            if not house_ids:
+                continue
+            model.objects.bulk_create(
+                [model(house_id=house_id) for house_id in house_ids],
+                ignore_conflicts=model is HouseSave,
+            )
+            adjust_counters(model, Counter(house_ids))
+    return sum(len(house_ids) for house_ids in by_model.values())
+
+
+class SwipeBuffer:
+    """Write-behind buffer for swipe events.
+
+    Events are written in batches once ``SWIPE_BUFFER_SIZE`` are queued or
+    ``SWIPE_FLUSH_SECONDS`` after the first queued event, whichever comes
+    first. A buffer size of 1 or less writes every batch immediately.
+    A failed write is logged and retried on a new timer; after
+    ``SWIPE_FLUSH_ATTEMPTS`` failures in a row its events are logged and
+    dropped so they can't block later swipes. Pending events are flushed at
+    interpreter exit, but events still in the buffer are lost if the
+    process is killed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.timer = None
+        self.failures = 0
+
+    def _schedule(self):
+        # Callers hold ``self.lock``.
+        if self.timer is None and self.pending:
+            self.timer = threading.Timer(getattr(settings, "SWIPE_FLUSH_SECONDS", 2.0), self._flush_from_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def add(self, events):
+        size = getattr(settings, "SWIPE_BUFFER_SIZE", 200)
+        with self.lock:
+            self.pending.extend(events)
+            full = len(self.pending) >= size
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write every pending event now; return how many were written."""
+        with self.lock:
+            events, self.pending = self.pending, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not events:
+            return 0
+        try:
+            written = write_swipes(events)
+        except Exception:
+            logger.exception("Failed to write %d swipe events", len(events))
+            with self.lock:
+                self.failures += 1
+                if self.failures >= getattr(settings, "SWIPE_FLUSH_ATTEMPTS", 3):
+                    logger.error(
+                        "Dropping %d swipe events after %d failed writes: %r",
+                        len(events),
+                        self.failures,
+                        events,
+                    )
+                    self.failures = 0
+                else:
+                    self.pending[:0] = events
+                self._schedule()
+            return 0
+        with self.lock:
+            self.failures = 0
+        return written
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads get their own connection; don't leak it.
+            connection.close()
+
+
+swipe_buffer = SwipeBuffer()
+atexit.register(swipe_buffer.flush)
+
+
+def record_swipes(events):
+    """Queue ``(action, house_id)`` events for writing."""
+    swipe_buffer.add(events)
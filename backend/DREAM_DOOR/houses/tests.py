@@ -1,7 +1,143 @@
-from django.core.management import call_command
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request
 
-from houses.models import House, HousePhoto
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from houses.cache import get_cache, payload_key, reset_cache_stats, set_payloads
+from houses.checks import check_shared_cache
+from houses.engagement import record_save, record_swipe
+from houses.geo import cell_ranges, grid_cell
+from houses.jsonstream import iter_json_array
+from houses.management.commands.ingest_realty import LISTING_PATHS, _extract_listings, prepare_listing
+from houses.projection import PRESETS, project
+from houses.models import (
+    House,
+    HouseDetail,
+    HouseDislike,
+    HouseImage,
+    HouseImportError,
+    HouseLike,
+    HousePhoto,
+    HouseSave,
+    IngestJob,
+    IngestWatermark,
+)
+from houses.realty import RateLimiter, RealtyClient
+from houses.renderers import FastJSONRenderer
+from houses.serializers import HouseSerializer
+from houses.swipes import swipe_buffer
+
+
+def _statements(captured_queries):
+    """SQL run, minus the savepoints TestCase adds around atomic blocks."""
+    return [query["sql"] for query in captured_queries if "SAVEPOINT" not in query["sql"]]
+
+
+@contextmanager
+def assert_statements(test, count):
+    with CaptureQueriesContext(connection) as ctx:
+        yield ctx
+    executed = _statements(ctx.captured_queries)
+    test.assertEqual(len(executed), count, "\n".join(executed))
+
+
+class StubRealtyServer:
+    """Local HTTP server standing in for the Realty API.
+
+    ``routes`` maps a URL path to a callable taking the parsed query dict and
+    request body and returning ``(status, body)`` or ``(status, body, headers)``.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stub.lock:
+                    stub.requests.append((parsed.path, parsed.query))
+                handler = stub.routes.get(parsed.path)
+                if handler is None:
+                    status, payload, headers = 404, {"error": "not found"}, {}
+                else:
+                    status, payload, *extra = handler(parse_qs(parsed.query), body)
+                    headers = extra[0] if extra else {}
+                raw = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        self.env = mock.patch.dict(
+            os.environ,
+            {"REALTY_API_BASE_URL": self.base_url, "REALTY_RAPIDAPI_KEY": "test-key"},
+        )
+        self.env.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _create_houses(count, prefix="ext"):
+    return [
+        House.objects.create(
+            source="realty_in_us",
+            external_id=f"{prefix}-{index}",
+            address_line=f"{index} Main St",
+            city="Testville",
+            state="CA",
+            postal_code="90210",
+        )
+        for index in range(count)
+    ]
 
 
 class NormalizePhotoUrlsCommandTests(TestCase):
@@ -78,3 +214,1356 @@ class NormalizePhotoUrlsCommandTests(TestCase):
 
         photo = HousePhoto.objects.get(house=house)
         self.assertEqual(photo.payload[0]["href"], "https://example.com/photo_s.jpg")
+
+
+    def test_batches_rows_by_id(self):
+        houses = _create_houses(5)
+        for house in houses:
+            HousePhoto.objects.create(house=house, payload=[{"href": "https://example.com/photo_s.jpg"}])
+        HousePhoto.objects.update(fetched_at=timezone.now() - timedelta(days=1))
+        stale = timezone.now() - timedelta(hours=1)
+        stdout = StringIO()
+
+        call_command("normalize_photo_urls", "--batch-size", "2", stdout=stdout)
+
+        self.assertEqual(stdout.getvalue().count("Progress:"), 3)
+        self.assertIn("Progress: 5/5 photo rows", stdout.getvalue())
+        self.assertIn("Updated 5 HousePhoto records.", stdout.getvalue())
+        for photo in HousePhoto.objects.all():
+            self.assertEqual(photo.payload[0]["href"], "https://example.com/photo_o.jpg")
+            self.assertGreater(photo.fetched_at, stale)
+
+    def test_workers_reject_limit(self):
+        with self.assertRaises(CommandError):
+            call_command("normalize_photo_urls", "--workers", "2", "--limit", "1")
+
+
+class IngestRealtyFetchCommandTests(TestCase):
+    def _detail_route(self, query, body):
+        property_id = query["property_id"][0]
+        home = {"property_id": property_id, "description": {"beds": 3, "text": "Sunny"}}
+        return 200, {"data": {"home": home}}
+
+    def _photos_route(self, query, body):
+        property_id = query["property_id"][0]
+        photos = [{"href": f"https://example.com/{property_id}s.jpg"}]
+        return 200, {"data": {"home_search": {"results": [{"photos": photos}]}}}
+
+    def test_concurrent_detail_fetch(self):
+        houses = _create_houses(12)
+        routes = {"/properties/v3/detail": self._detail_route}
+        with StubRealtyServer(routes) as server:
+            call_command(
+                "ingest_realty_detail",
+                "--concurrency",
+                "4",
+                "--rate",
+                "0",
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(len(server.requests), 12)
+        for house in houses:
+            detail = HouseDetail.objects.get(house=house)
+            self.assertEqual(detail.payload["property_id"], house.external_id)
+            self.assertEqual(detail.card_payload, {"description": {"beds": 3, "text": "Sunny"}})
+
+    def test_concurrent_photo_fetch(self):
+        houses = _create_houses(5)
+        routes = {"/properties/v3/get-photos": self._photos_route}
+        with StubRealtyServer(routes):
+            call_command(
+                "ingest_realty_photos",
+                "--concurrency",
+                "3",
+                "--rate",
+                "0",
+                stdout=StringIO(),
+            )
+
+        for house in houses:
+            photos = HousePhoto.objects.get(house=house)
+            self.assertEqual(photos.payload[0]["href"], f"https://example.com/{house.external_id}o.jpg")
+            image = HouseImage.objects.get(house=house)
+            self.assertEqual(image.ordinal, 0)
+            self.assertEqual(image.original_url, f"https://example.com/{house.external_id}o.jpg")
+            self.assertEqual(image.small_url, f"https://example.com/{house.external_id}s.jpg")
+
+    def test_house_error_is_recorded_and_run_continues(self):
+        houses = _create_houses(4)
+
+        def route(query, body):
+            if query["property_id"][0] == houses[2].external_id:
+                return 404, {"message": "delisted"}
+            return self._detail_route(query, body)
+
+        stdout = StringIO()
+        with StubRealtyServer({"/properties/v3/detail": route}):
+            call_command(
+                "ingest_realty_detail",
+                "--concurrency",
+                "2",
+                "--rate",
+                "0",
+                stdout=stdout,
+                stderr=StringIO(),
+            )
+
+        self.assertEqual(
+            sorted(HouseDetail.objects.values_list("house_id", flat=True)),
+            [houses[0].id, houses[1].id, houses[3].id],
+        )
+        errors = HouseImportError.objects.filter(import_type="details")
+        self.assertEqual(list(errors.values_list("house_id", flat=True)), [houses[2].id])
+        self.assertIn("errors=1", stdout.getvalue())
+        job = IngestJob.objects.get(command="ingest_realty_detail")
+        self.assertEqual((job.status, job.processed_count), (IngestJob.STATUS_COMPLETED, 4))
+
+    def test_fatal_error_records_remaining_houses(self):
+        houses = _create_houses(4)
+
+        def route(query, body):
+            if query["property_id"][0] == houses[2].external_id:
+                return 403, {"message": "plan quota exceeded"}
+            return self._detail_route(query, body)
+
+        stdout = StringIO()
+        with StubRealtyServer({"/properties/v3/detail": route}):
+            call_command(
+                "ingest_realty_detail",
+                "--concurrency",
+                "1",
+                "--rate",
+                "0",
+                stdout=stdout,
+                stderr=StringIO(),
+            )
+
+        self.assertEqual(HouseDetail.objects.count(), 2)
+        errors = HouseImportError.objects.filter(import_type="details")
+        self.assertEqual(
+            sorted(errors.values_list("house_id", flat=True)),
+            [houses[2].id, houses[3].id],
+        )
+        self.assertIn("Import halted", stdout.getvalue())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(TestCase):
+    def test_limits_sustained_rate(self):
+        clock = FakeClock()
+        limiter = RateLimiter(2, burst=2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(6):
+            limiter.acquire()
+
+        # Two burst tokens, then one token every half second.
+        self.assertAlmostEqual(clock.now, 2.0)
+
+    def test_pause_blocks_until_resume(self):
+        clock = FakeClock()
+        limiter = RateLimiter(10, clock=clock, sleep=clock.sleep)
+
+        limiter.pause(5)
+        limiter.acquire()
+
+        self.assertGreaterEqual(clock.now, 5.0)
+
+    def test_zero_rate_is_unlimited(self):
+        clock = FakeClock()
+        limiter = RateLimiter(0, clock=clock, sleep=clock.sleep)
+
+        for _ in range(100):
+            limiter.acquire()
+
+        self.assertEqual(clock.sleeps, [])
+
+
+class RealtyClientRetryTests(TestCase):
+    def _request(self, server):
+        return Request(f"{server.base_url}/properties/v3/detail?property_id=1")
+
+    def test_retries_rate_limited_response(self):
+        attempts = []
+
+        def route(query, body):
+            attempts.append(1)
+            if len(attempts) < 3:
+                return 429, {"message": "slow down"}, {"Retry-After": "2"}
+            return 200, {"ok": True}
+
+        sleeps = []
+        with StubRealtyServer({"/properties/v3/detail": route}) as server:
+            client = RealtyClient(rate=0, max_retries=5, sleep=sleeps.append)
+            payload = client.fetch_json(self._request(server))
+
+        self.assertEqual(payload, {"ok": True})
+        self.assertEqual(len(attempts), 3)
+        self.assertIn(2.0, sleeps)
+
+    def test_gives_up_after_max_retries(self):
+        with StubRealtyServer({"/properties/v3/detail": lambda query, body: (503, {})}) as server:
+            client = RealtyClient(rate=0, max_retries=2, sleep=lambda seconds: None)
+            with self.assertRaises(HTTPError):
+                client.fetch_json(self._request(server))
+
+        self.assertEqual(len(server.requests), 3)
+
+    def test_does_not_retry_client_errors(self):
+        with StubRealtyServer({"/properties/v3/detail": lambda query, body: (400, {})}) as server:
+            client = RealtyClient(rate=0, max_retries=5, sleep=lambda seconds: None)
+            with self.assertRaises(HTTPError):
+                client.fetch_json(self._request(server))
+
+        self.assertEqual(len(server.requests), 1)
+
+
+def _listing(property_id, postal_code="90210", list_date="2024-01-01T00:00:00Z", price=500000):
+    return {
+        "property_id": property_id,
+        "status": "for_sale",
+        "list_price": price,
+        "list_date": list_date,
+        "description": {"beds": 3, "baths": 2, "sqft": 1500, "type": "single_family"},
+        "location": {
+            "address": {
+                "line": f"{property_id} Main St",
+                "city": "Testville",
+                "state_code": "CA",
+                "postal_code": postal_code,
+                "coordinate": {"lat": 34.1, "lon": -118.4},
+            }
+        },
+    }
+
+
+class IngestRealtyCommandTests(TestCase):
+    def _list_route(self, listings_by_zip):
+        def route(query, body):
+            request = json.loads(body)
+            listings = listings_by_zip.get(request["postal_code"], [])
+            page = listings[request["offset"]: request["offset"] + request["limit"]]
+            return 200, {"data": {"home_search": {"results": page}}}
+
+        return route
+
+    def test_paginates_multiple_zips(self):
+        listings_by_zip = {
+            "90210": [_listing(f"a-{index}", "90210") for index in range(5)],
+            "94110": [_listing(f"b-{index}", "94110") for index in range(2)],
+        }
+        stdout = StringIO()
+        with StubRealtyServer({"/properties/v3/list": self._list_route(listings_by_zip)}) as server:
+            call_command(
+                "ingest_realty",
+                "--zip",
+                "90210",
+                "94110",
+                "--limit",
+                "2",
+                "--concurrency",
+                "2",
+                "--rate",
+                "0",
+                stdout=stdout,
+            )
+
+        self.assertEqual(House.objects.filter(postal_code="90210").count(), 5)
+        self.assertEqual(House.objects.filter(postal_code="94110").count(), 2)
+        # 90210: offsets 0, 2, 4; 94110: offsets 0, 2 (empty page ends pagination).
+        self.assertEqual(len(server.requests), 5)
+        self.assertIn("listings/sec", stdout.getvalue())
+
+    def test_zip_file_and_max_pages(self):
+        listings_by_zip = {"90210": [_listing(f"a-{index}") for index in range(6)]}
+        zip_file = os.path.join(self._tmpdir(), "zips.txt")
+        with open(zip_file, "w") as handle:
+            handle.write("90210\n")
+
+        with StubRealtyServer({"/properties/v3/list": self._list_route(listings_by_zip)}):
+            call_command(
+                "ingest_realty",
+                "--zip-file",
+                zip_file,
+                "--limit",
+                "2",
+                "--max-pages",
+                "2",
+                "--rate",
+                "0",
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(House.objects.count(), 4)
+
+    def _run_upsert(self):
+        House.objects.create(
+            source="realty_in_us",
+            external_id="a-0",
+            address_line="old",
+            city="Old",
+            state="CA",
+            postal_code="90210",
+        )
+        listings_by_zip = {"90210": [_listing(f"a-{index}") for index in range(5)]}
+        stdout = StringIO()
+        with StubRealtyServer({"/properties/v3/list": self._list_route(listings_by_zip)}):
+            call_command(
+                "ingest_realty",
+                "--zip",
+                "90210",
+                "--batch-size",
+                "2",
+                "--rate",
+                "0",
+                stdout=stdout,
+            )
+
+        self.assertIn("created=4, updated=1", stdout.getvalue())
+        self.assertEqual(House.objects.count(), 5)
+        updated = House.objects.get(external_id="a-0")
+        self.assertEqual(updated.address_line, "a-0 Main St")
+        self.assertEqual(updated.price, 500000)
+
+    def test_bulk_upsert(self):
+        self._run_upsert()
+
+    def test_bulk_upsert_without_conflict_support(self):
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            self._run_upsert()
+
+    def test_incremental_stops_at_watermark(self):
+        listings_by_zip = {
+            "90210": [
+                _listing(f"a-{index}", list_date=f"2024-01-{10 - index:02d}T00:00:00Z")
+                for index in range(6)
+            ]
+        }
+        route = self._list_route(listings_by_zip)
+        with StubRealtyServer({"/properties/v3/list": route}) as server:
+            args = ["ingest_realty", "--zip", "90210", "--limit", "2", "--incremental", "--rate", "0"]
+            call_command(*args, stdout=StringIO())
+            self.assertEqual(House.objects.count(), 6)
+            watermark = IngestWatermark.objects.get(postal_code="90210")
+            self.assertEqual(watermark.list_date.day, 10)
+
+            # Two new listings arrive and a-1 drops its price.
+            listings_by_zip["90210"][:0] = [
+                _listing("new-1", list_date="2024-01-12T00:00:00Z"),
+                _listing("new-2", list_date="2024-01-11T00:00:00Z"),
+            ]
+            listings_by_zip["90210"][3]["list_price"] = 1
+            server.requests.clear()
+            stdout = StringIO()
+            call_command(*args, stdout=stdout)
+
+        # Page 1 (new-1, new-2) is all newer; page 2 (a-0, a-1) dips below it.
+        self.assertEqual(len(server.requests), 2)
+        self.assertIn("created=2, updated=1, unchanged=1", stdout.getvalue())
+        self.assertEqual(House.objects.get(external_id="a-1").price, 1)
+        self.assertEqual(IngestWatermark.objects.get(postal_code="90210").list_date.day, 12)
+
+    def test_partial_paging_keeps_watermark(self):
+        listings_by_zip = {
+            "90210": [
+                _listing(f"a-{index}", list_date=f"2024-01-{10 - index:02d}T00:00:00Z")
+                for index in range(6)
+            ]
+        }
+        route = self._list_route(listings_by_zip)
+        args = ["ingest_realty", "--zip", "90210", "--limit", "2", "--incremental", "--rate", "0"]
+        with StubRealtyServer({"/properties/v3/list": route}):
+            call_command(*args, "--max-pages", "1", stdout=StringIO())
+            call_command(*args, "--offset", "2", stdout=StringIO())
+            self.assertFalse(IngestWatermark.objects.exists())
+
+            call_command(*args, stdout=StringIO())
+
+        self.assertEqual(House.objects.count(), 6)
+        self.assertEqual(IngestWatermark.objects.get(postal_code="90210").list_date.day, 10)
+
+    def _tmpdir(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        return tmpdir.name
+
+
+class BackfillRealtyPagesTests(TestCase):
+    def _write_pages(self, pages):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        for index, listings in enumerate(pages):
+            with open(os.path.join(tmpdir.name, f"page-{index:03d}.json"), "w") as handle:
+                json.dump({"data": {"home_search": {"results": listings}}}, handle)
+        return tmpdir.name
+
+    def test_backfills_pages_in_process_pool(self):
+        pages = [[_listing(f"p{page}-{index}") for index in range(5)] for page in range(3)]
+        pages[2].append(_listing("p0-0", price=1))
+        stdout = StringIO()
+
+        call_command(
+            "backfill_realty_pages",
+            self._write_pages(pages),
+            "--workers",
+            "2",
+            "--chunk-size",
+            "2",
+            "--batch-size",
+            "4",
+            stdout=stdout,
+        )
+
+        self.assertIn("created=15, updated=1", stdout.getvalue())
+        self.assertIn("Progress: 3/3 pages", stdout.getvalue())
+        self.assertEqual(House.objects.count(), 15)
+        # The later page wins.
+        self.assertEqual(House.objects.get(external_id="p0-0").price, 1)
+        self.assertIsNotNone(House.objects.get(external_id="p1-1").geo_cell)
+
+    def test_inline_normalization_matches_ingest(self):
+        listing = _listing("solo", postal_code="")
+        directory = self._write_pages([[listing, "not-a-listing"]])
+
+        call_command("backfill_realty_pages", directory, "--workers", "1", "--zip", "94110", stdout=StringIO())
+
+        house = House.objects.get(external_id="solo")
+        self.assertEqual(house.postal_code, "94110")
+        self.assertEqual(house.price, 500000)
+        self.assertEqual(house.content_hash, prepare_listing(listing, "94110")[1]["content_hash"])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_listing_normalization", "--listings", "200", "--workers", "1", "2", stdout=out)
+        self.assertIn("2: ", out.getvalue())
+
+
+class BulkFetchWriteTests(TestCase):
+    def _photos_route(self, query, body):
+        photos = [{"href": "https://example.com/photos.jpg"}]
+        return 200, {"data": {"home_search": {"results": [{"photos": photos}]}}}
+
+    def test_batches_updates_existing_rows(self):
+        houses = _create_houses(5)
+        HousePhoto.objects.create(house=houses[0], payload=[{"href": "old"}])
+        stdout = StringIO()
+        with StubRealtyServer({"/properties/v3/get-photos": self._photos_route}):
+            with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False):
+                call_command(
+                    "ingest_realty_photos",
+                    "--batch-size",
+                    "2",
+                    "--rate",
+                    "0",
+                    stdout=stdout,
+                )
+
+        self.assertIn("created=4, updated=1", stdout.getvalue())
+        self.assertEqual(HousePhoto.objects.count(), 5)
+        self.assertEqual(
+            HousePhoto.objects.get(house=houses[0]).payload[0]["href"],
+            "https://example.com/photoo.jpg",
+        )
+
+    def test_mass_failure_uses_single_insert(self):
+        _create_houses(30)
+
+        with StubRealtyServer({"/properties/v3/detail": lambda query, body: (401, {})}):
+            # SELECT houses, INSERT the job, one bulk INSERT for all error rows,
+            # UPDATE the job status.
+            with assert_statements(self, 4):
+                call_command(
+                    "ingest_realty_detail",
+                    "--rate",
+                    "0",
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+        self.assertEqual(HouseImportError.objects.filter(import_type="details").count(), 30)
+
+
+class FetchSelectionTests(TestCase):
+    def _detail_route(self, query, body):
+        return 200, {"data": {"home": {"property_id": query["property_id"][0]}}}
+
+    def _run(self, *args):
+        with StubRealtyServer({"/properties/v3/detail": self._detail_route}) as server:
+            call_command("ingest_realty_detail", "--rate", "0", *args, stdout=StringIO())
+        return [parse_qs(query)["property_id"][0] for _, query in server.requests]
+
+    def test_stale_after_skips_fresh_rows(self):
+        fresh, stale, missing = _create_houses(3)
+        HouseDetail.objects.create(house=fresh, payload={})
+        HouseDetail.objects.create(house=stale, payload={})
+        HouseDetail.objects.filter(house=stale).update(fetched_at=timezone.now() - timedelta(days=10))
+
+        fetched = self._run("--stale-after", "7d")
+
+        self.assertEqual(sorted(fetched), sorted([stale.external_id, missing.external_id]))
+
+    def test_missing_only(self):
+        fetched_house, missing = _create_houses(2)
+        HouseDetail.objects.create(house=fetched_house, payload={})
+
+        self.assertEqual(self._run("--missing-only"), [missing.external_id])
+
+    def test_prioritize_spends_budget_on_popular_houses(self):
+        quiet, popular, saved = _create_houses(3)
+        for house in (quiet, popular, saved):
+            HouseDetail.objects.create(house=house, payload={})
+        record_swipe(HouseLike, popular.pk)
+        record_swipe(HouseLike, popular.pk)
+        record_save(saved.pk)
+
+        fetched = self._run("--prioritize", "--limit", "2", "--concurrency", "1")
+
+        self.assertEqual(fetched, [popular.external_id, saved.external_id])
+
+
+class ResumableJobTests(TestCase):
+    def test_resume_halted_fetch_job(self):
+        houses = _create_houses(6)
+        failing = {houses[3].external_id}
+
+        def route(query, body):
+            property_id = query["property_id"][0]
+            if property_id in failing:
+                return 401, {"message": "invalid key"}
+            return 200, {"data": {"home": {"property_id": property_id}}}
+
+        with StubRealtyServer({"/properties/v3/detail": route}) as server:
+            call_command(
+                "ingest_realty_detail",
+                "--batch-size",
+                "2",
+                "--rate",
+                "0",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            job = IngestJob.objects.get(command="ingest_realty_detail")
+            self.assertEqual(job.status, IngestJob.STATUS_HALTED)
+            self.assertEqual(job.processed_count, 3)
+
+            failing.clear()
+            server.requests.clear()
+            call_command(
+                "ingest_realty_detail",
+                "--resume",
+                str(job.id),
+                "--rate",
+                "0",
+                stdout=StringIO(),
+            )
+
+        fetched = [parse_qs(query)["property_id"][0] for _, query in server.requests]
+        self.assertEqual(fetched, [house.external_id for house in houses[3:]])
+        self.assertEqual(HouseDetail.objects.count(), 6)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.STATUS_COMPLETED)
+        self.assertEqual(job.processed_count, 6)
+
+    def test_resume_halted_list_job(self):
+        listings = [_listing(f"a-{index}") for index in range(5)]
+        offsets = []
+        fail_offsets = {2}
+
+        def route(query, body):
+            request = json.loads(body)
+            offsets.append(request["offset"])
+            if request["offset"] in fail_offsets:
+                return 400, {"message": "bad page"}
+            page = listings[request["offset"]: request["offset"] + request["limit"]]
+            return 200, {"data": {"home_search": {"results": page}}}
+
+        args = ["ingest_realty", "--zip", "90210", "--limit", "2", "--rate", "0"]
+        with StubRealtyServer({"/properties/v3/list": route}):
+            call_command(*args, stdout=StringIO(), stderr=StringIO())
+            job = IngestJob.objects.get(command="ingest_realty")
+            self.assertEqual(job.status, IngestJob.STATUS_HALTED)
+            self.assertEqual(job.checkpoint, {"pages": {"90210": [2, 2]}})
+
+            fail_offsets.clear()
+            offsets.clear()
+            call_command("ingest_realty", "--resume", str(job.id), "--rate", "0", stdout=StringIO())
+
+        self.assertEqual(offsets, [2, 4])
+        self.assertEqual(House.objects.count(), 5)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.STATUS_COMPLETED)
+
+    def test_resume_rejects_completed_job(self):
+        job = IngestJob.objects.create(command="ingest_realty_detail", status=IngestJob.STATUS_COMPLETED)
+
+        with mock.patch.dict(os.environ, {"REALTY_RAPIDAPI_KEY": "test-key"}):
+            with self.assertRaises(CommandError):
+                call_command("ingest_realty_detail", "--resume", str(job.id), stdout=StringIO())
+
+
+class JsonStreamTests(TestCase):
+    def _items(self, document, paths, chunk_size=7):
+        return list(iter_json_array(BytesIO(json.dumps(document).encode("utf-8")), paths, chunk_size))
+
+    def test_streams_items_at_nested_path(self):
+        document = {
+            "meta": {"ignored": [1, 2, {"deep": "x" * 50}]},
+            "data": {"home_search": {"total": 12345, "results": [{"id": 1}, {"id": 2, "s": "a,b]}"}, 3]}},
+        }
+        items = self._items(document, [("data", "home_search", "results")])
+        self.assertEqual(items, [{"id": 1}, {"id": 2, "s": "a,b]}"}, 3])
+
+    def test_first_matching_path_wins(self):
+        document = {"data": {"home_search": {"results": {"results": [{"id": 1}]}}}, "results": [9]}
+        paths = [("data", "home_search", "results"), ("data", "home_search", "results", "results"), ("results",)]
+        self.assertEqual(self._items(document, paths), [{"id": 1}])
+
+    def test_path_priority_beats_document_order(self):
+        document = {"results": [{"id": "wrong"}], "data": {"home_search": {"results": [{"id": "right"}]}}}
+        self.assertEqual(self._items(document, LISTING_PATHS), [{"id": "right"}])
+        self.assertEqual(self._items(document, LISTING_PATHS), _extract_listings(document))
+
+    def test_lower_priority_path_used_when_better_ones_absent(self):
+        document = {"results": [{"id": 1}, {"id": 2}], "data": {"home_search": {"total": 0}}, "meta": [3]}
+        paths = [("data", "home_search", "results"), ("results",)]
+        self.assertEqual(self._items(document, paths), [{"id": 1}, {"id": 2}])
+
+    def test_numbers_split_across_chunks(self):
+        document = {"results": [123456789, 98765.4321]}
+        self.assertEqual(self._items(document, [("results",)], chunk_size=3), [123456789, 98765.4321])
+
+    def test_missing_path_yields_nothing(self):
+        self.assertEqual(self._items({"data": {"other": []}}, [("data", "results")]), [])
+
+    def test_truncated_document_raises(self):
+        stream = BytesIO(b'{"results": [{"id": 1}, {"id"')
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array(stream, [("results",)], chunk_size=4))
+
+
+class DeckPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _collect(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item["id"] for item in response.json()["results"])
+            url = response.json()["next"]
+            pages += 1
+        return ids, pages
+
+    def test_deck_cursor_pages_without_count(self):
+        houses = _create_houses(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/deck/?limit=2")
+        self.assertNotIn("count", response.json())
+        self.assertFalse(any("COUNT(" in sql.upper() for sql in _statements(queries.captured_queries)))
+
+        ids, pages = self._collect("/api/deck/?limit=2")
+        self.assertEqual(ids, [house.id for house in houses])
+        self.assertEqual(pages, 3)
+
+    def test_saved_orders_null_list_dates_first(self):
+        houses = _create_houses(5)
+        for index, house in enumerate(houses[:3]):
+            house.list_date = timezone.now() - timedelta(days=index % 2)
+            house.save()
+        for house in houses:
+            HouseSave.objects.create(house=house)
+
+        ids, _ = self._collect("/api/saved/?limit=2")
+
+        expected = [houses[4].id, houses[3].id, houses[2].id, houses[0].id, houses[1].id]
+        self.assertEqual(ids, expected)
+
+    def test_saved_cursor_is_a_row_comparison(self):
+        houses = _create_houses(6)
+        listed = timezone.now()
+        for index, house in enumerate(houses):
+            house.list_date = listed - timedelta(days=index // 2)
+            house.save()
+            HouseSave.objects.create(house=house)
+
+        first = self.client.get("/api/saved/?limit=3").json()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(first["next"]).json()
+
+        # One range condition the (-list_date, -id) index can seek to, not an OR.
+        sql, = _statements(queries.captured_queries)
+        self.assertIn(') < (', sql)
+        self.assertNotIn(" OR ", sql)
+        ids = [item["id"] for item in first["results"] + second["results"]]
+        self.assertEqual(ids, [houses[1].id, houses[0].id, houses[3].id, houses[2].id, houses[5].id, houses[4].id])
+
+    def test_offset_requests_use_limit_offset(self):
+        _create_houses(3)
+
+        response = self.client.get("/api/deck/?limit=2&offset=2")
+
+        self.assertEqual(response.json()["count"], 3)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/deck/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class DeckFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _deck_ids(self, query=""):
+        response = self.client.get(f"/api/deck/{query}")
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.json()["results"]]
+
+    def test_excludes_swiped_houses_in_one_query(self):
+        liked, disliked, saved, fresh = _create_houses(4)
+        HouseLike.objects.create(house=liked)
+        HouseDislike.objects.create(house=disliked)
+        HouseSave.objects.create(house=saved)
+
+        with assert_statements(self, 1):
+            ids = self._deck_ids()
+
+        self.assertEqual(ids, [fresh.id])
+        self.assertEqual(len(self._deck_ids("?include_seen=1")), 4)
+
+    def test_filters(self):
+        cheap, pricey, other_state = _create_houses(3)
+        House.objects.filter(id=cheap.id).update(price=300000, beds=2, property_type="condos")
+        House.objects.filter(id=pricey.id).update(price=900000, beds=4, property_type="single_family")
+        House.objects.filter(id=other_state.id).update(price=500000, beds=3, state="NV")
+
+        self.assertEqual(self._deck_ids("?max_price=400000"), [cheap.id])
+        self.assertEqual(self._deck_ids("?min_beds=3&state=CA"), [pricey.id])
+        self.assertEqual(self._deck_ids("?property_type=condos,single_family"), [cheap.id, pricey.id])
+        self.assertEqual(self._deck_ids("?zip=90210&min_price=450000&max_price=600000"), [other_state.id])
+
+    def test_invalid_filter(self):
+        response = self.client.get("/api/deck/?min_price=cheap")
+        self.assertEqual(response.status_code, 400)
+
+    def test_benchmark_command_rolls_back(self):
+        out = StringIO()
+        # The test database is already a scratch database.
+        call_command("benchmark_deck_queries", "--rows", "200", "--repeat", "1", "--in-place", stdout=out)
+
+        self.assertIn("deck_zip_price", out.getvalue())
+        self.assertIn("rolled back", out.getvalue())
+        self.assertFalse(House.objects.filter(source="benchmark").exists())
+        index_names = {
+            name
+            for name, info in connection.introspection.get_constraints(
+                connection.cursor(), House._meta.db_table
+            ).items()
+            if info["index"]
+        }
+        self.assertIn("house_postal_code_price_idx", index_names)
+
+    def test_benchmark_command_uses_scratch_database_by_default(self):
+        creation = connection.creation
+        with mock.patch.object(creation, "create_test_db") as create, \
+                mock.patch.object(creation, "destroy_test_db") as destroy:
+            call_command("benchmark_deck_queries", "--rows", "20", "--repeat", "1", stdout=StringIO())
+
+        create.assert_called_once()
+        destroy.assert_called_once_with(connection.settings_dict["NAME"], verbosity=0)
+
+
+class DeckGeoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # Santa Monica, downtown Los Angeles (~14 miles away) and San Francisco.
+        self.santa_monica, self.downtown, self.san_francisco = _create_houses(3)
+        for house, (lat, lng) in [
+            (self.santa_monica, (34.0195, -118.4912)),
+            (self.downtown, (34.0522, -118.2437)),
+            (self.san_francisco, (37.7749, -122.4194)),
+        ]:
+            house.lat, house.lng = lat, lng
+            house.save()
+
+    def _deck_ids(self, query):
+        response = self.client.get(f"/api/deck/{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item["id"] for item in response.json()["results"]]
+
+    def test_save_assigns_grid_cell(self):
+        self.assertEqual(self.downtown.geo_cell, grid_cell(34.0522, -118.2437))
+        self.assertNotEqual(self.downtown.geo_cell, self.san_francisco.geo_cell)
+
+    def test_bounding_box(self):
+        ids = self._deck_ids("?bbox=33.9,-118.6,34.1,-118.1")
+        self.assertEqual(ids, [self.santa_monica.id, self.downtown.id])
+        self.assertEqual(self._deck_ids("?bbox=33.9,-118.6,34.1,-118.3"), [self.santa_monica.id])
+
+    def test_radius(self):
+        self.assertEqual(self._deck_ids("?lat=34.0195&lng=-118.4912&radius=5"), [self.santa_monica.id])
+        self.assertEqual(
+            self._deck_ids("?lat=34.0195&lng=-118.4912&radius=20"),
+            [self.santa_monica.id, self.downtown.id],
+        )
+        self.assertEqual(len(self._deck_ids("?lat=36&lng=-120&radius=400")), 3)
+
+    def test_cells_cover_antimeridian(self):
+        ranges = cell_ranges(10.0, 179.95, 10.05, -179.95)
+        self.assertEqual(len(ranges), 2)
+        self.assertIn(grid_cell(10.01, 179.99), range(ranges[0][0], ranges[0][1] + 1))
+        self.assertIn(grid_cell(10.01, -179.99), range(ranges[1][0], ranges[1][1] + 1))
+
+    def test_invalid_geo_params(self):
+        self.assertEqual(self.client.get("/api/deck/?bbox=1,2,3").status_code, 400)
+        self.assertEqual(self.client.get("/api/deck/?lat=34&lng=-118").status_code, 400)
+        self.assertEqual(self.client.get("/api/deck/?lat=34&lng=-118&radius=0").status_code, 400)
+
+
+class EngagementCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_swipe_views_maintain_counters(self):
+        house, = _create_houses(1)
+        self.client.post(f"/api/houses/{house.id}/like/")
+        self.client.post(f"/api/houses/{house.id}/like/")
+        self.client.post(f"/api/houses/{house.id}/dislike/")
+        self.client.post(f"/api/houses/{house.id}/save/")
+        self.client.post(f"/api/houses/{house.id}/save/")
+
+        house.refresh_from_db()
+        self.assertEqual((house.like_count, house.dislike_count, house.save_count), (2, 1, 1))
+        response = self.client.get("/api/saved/")
+        self.assertEqual(response.json()["results"][0]["like_count"], 2)
+
+        self.client.delete(f"/api/houses/{house.id}/unsave/")
+        self.client.delete(f"/api/houses/{house.id}/unsave/")
+        house.refresh_from_db()
+        self.assertEqual(house.save_count, 0)
+
+    def test_unsave_of_uncounted_save_keeps_counter_at_zero(self):
+        house, = _create_houses(1)
+        # Created outside the views, so save_count was never bumped.
+        HouseSave.objects.create(house=house)
+
+        response = self.client.delete(f"/api/houses/{house.id}/unsave/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"success": True})
+        house.refresh_from_db()
+        self.assertEqual(house.save_count, 0)
+
+    def test_rollup_repairs_drift(self):
+        drifted, accurate = _create_houses(2)
+        HouseLike.objects.create(house=drifted)
+        HouseSave.objects.create(house=drifted)
+        record_swipe(HouseLike, accurate.pk)
+        out = StringIO()
+
+        call_command("rollup_engagement_counts", stdout=out)
+
+        self.assertIn("Corrected counters on 1 houses.", out.getvalue())
+        drifted.refresh_from_db()
+        self.assertEqual((drifted.like_count, drifted.save_count), (1, 1))
+
+
+@override_settings(SWIPE_BUFFER_SIZE=1)
+class SwipeBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _post(self, swipes):
+        return self.client.post("/api/swipes/", {"swipes": swipes}, format="json")
+
+    def test_batch_writes_swipes_and_counters(self):
+        first, second = _create_houses(2)
+        response = self._post([
+            {"house_id": first.id, "action": "like"},
+            {"house_id": first.id, "action": "like"},
+            {"house_id": second.id, "action": "dislike"},
+            {"house_id": second.id, "action": "save"},
+            {"house_id": second.id, "action": "save"},
+            {"house_id": 9999, "action": "like"},
+        ])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"accepted": 5, "missing": [9999]})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.like_count, 2)
+        self.assertEqual((second.dislike_count, second.save_count), (1, 1))
+        self.assertEqual(HouseLike.objects.count(), 2)
+        self.assertEqual(HouseSave.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        houses = _create_houses(20)
+        swipes = [{"house_id": house.id, "action": "like"} for house in houses]
+        # House lookup, write-time recheck, bulk insert and one counter UPDATE.
+        with assert_statements(self, 4):
+            response = self._post(swipes)
+        self.assertEqual(response.json()["accepted"], 20)
+
+    def test_invalid_batch(self):
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self._post([{"house_id": 1, "action": "superlike"}]).status_code, 400)
+
+    @override_settings(SWIPE_BUFFER_SIZE=10, SWIPE_FLUSH_SECONDS=60)
+    def test_buffer_defers_writes_until_flush(self):
+        house, = _create_houses(1)
+        self._post([{"house_id": house.id, "action": "like"}])
+        self.assertFalse(HouseLike.objects.exists())
+
+        self.assertEqual(swipe_buffer.flush(), 1)
+        house.refresh_from_db()
+        self.assertEqual(house.like_count, 1)
+
+    @override_settings(SWIPE_BUFFER_SIZE=10, SWIPE_FLUSH_SECONDS=60)
+    def test_flush_skips_houses_deleted_while_buffered(self):
+        kept, deleted = _create_houses(2)
+        self._post([{"house_id": kept.id, "action": "like"}, {"house_id": deleted.id, "action": "like"}])
+        deleted.delete()
+
+        self.assertEqual(swipe_buffer.flush(), 1)
+        self.assertEqual(list(HouseLike.objects.values_list("house_id", flat=True)), [kept.id])
+        self.assertEqual(swipe_buffer.pending, [])
+
+    @override_settings(SWIPE_BUFFER_SIZE=10, SWIPE_FLUSH_SECONDS=60)
+    def test_flush_does_not_count_saves_made_while_buffered(self):
+        house, = _create_houses(1)
+        self._post([{"house_id": house.id, "action": "save"}])
+        record_save(house.id)
+
+        self.assertEqual(swipe_buffer.flush(), 0)
+        house.refresh_from_db()
+        self.assertEqual((house.save_count, HouseSave.objects.count()), (1, 1))
+
+    @override_settings(SWIPE_BUFFER_SIZE=10, SWIPE_FLUSH_SECONDS=60, SWIPE_FLUSH_ATTEMPTS=2)
+    def test_failed_flush_retries_then_drops(self):
+        house, = _create_houses(1)
+        self._post([{"house_id": house.id, "action": "like"}])
+
+        with mock.patch("houses.swipes.write_swipes", side_effect=DatabaseError("down")):
+            with self.assertLogs("houses.swipes", "ERROR"):
+                self.assertEqual(swipe_buffer.flush(), 0)
+            # Requeued with a new timer to retry.
+            self.assertEqual(swipe_buffer.pending, [("like", house.id)])
+            self.assertIsNotNone(swipe_buffer.timer)
+
+            with self.assertLogs("houses.swipes", "ERROR") as logs:
+                self.assertEqual(swipe_buffer.flush(), 0)
+        self.assertIn("Dropping 1 swipe events", "\n".join(logs.output))
+        self.assertEqual(swipe_buffer.pending, [])
+        self.assertIsNone(swipe_buffer.timer)
+
+        # Later swipes are not blocked by the dropped batch.
+        self._post([{"house_id": house.id, "action": "like"}])
+        self.assertEqual(swipe_buffer.flush(), 1)
+
+
+class ActionViewQueryCountTests(TestCase):
+    """Statements per request (see ``_statements``)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.house, = _create_houses(1)
+
+    def _request(self, method, path, statements, status_code):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(path)
+        executed = _statements(ctx.captured_queries)
+        self.assertEqual(response.status_code, status_code, response.content)
+        self.assertEqual(len(executed), statements, "\n".join(executed))
+        return response
+
+    def test_swipes(self):
+        house_id = self.house.id
+        self._request("post", f"/api/houses/{house_id}/like/", 2, 201)
+        self._request("post", f"/api/houses/{house_id}/dislike/", 2, 201)
+        self._request("post", f"/api/houses/{house_id}/save/", 2, 201)
+        self._request("post", f"/api/houses/{house_id}/save/", 2, 201)
+        self._request("delete", f"/api/houses/{house_id}/unsave/", 2, 200)
+        self._request("post", "/api/houses/9999/like/", 1, 404)
+        self._request("post", "/api/houses/9999/save/", 2, 404)
+
+        self.house.refresh_from_db()
+        self.assertEqual((self.house.like_count, self.house.dislike_count, self.house.save_count), (1, 1, 0))
+
+    def test_detail_and_photos(self):
+        house_id = self.house.id
+        self._request("get", f"/api/houses/{house_id}/detail/", 1, 404)
+        self._request("get", f"/api/houses/{house_id}/photos/", 1, 404)
+        self._request("get", "/api/houses/9999/detail/", 1, 404)
+
+        HouseDetail.objects.create(house=self.house, payload={"beds": 3})
+        HousePhoto.objects.create(house=self.house, payload=[{"href": "https://example.com/a.jpg"}])
+        response = self._request("get", f"/api/houses/{house_id}/detail/", 1, 200)
+        self.assertEqual(response.json(), {"beds": 3})
+        response = self._request("get", f"/api/houses/{house_id}/photos/", 1, 200)
+        self.assertEqual(response.json(), [{"href": "https://example.com/a.jpg"}])
+
+
+class HouseBundleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.complete, self.bare = _create_houses(2)
+        HouseDetail.objects.create(house=self.complete, payload={"beds": 3})
+        HousePhoto.objects.create(house=self.complete, payload=[{"href": "https://example.com/a.jpg"}])
+
+    def test_single_bundle(self):
+        with assert_statements(self, 1):
+            response = self.client.get(f"/api/houses/{self.complete.id}/bundle/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], self.complete.id)
+        self.assertEqual(response.json()["detail"], {"beds": 3})
+        self.assertEqual(response.json()["photos"], [{"href": "https://example.com/a.jpg"}])
+        self.assertEqual(self.client.get("/api/houses/9999/bundle/").status_code, 404)
+
+    def test_batch_bundle_keeps_request_order(self):
+        with assert_statements(self, 1):
+            response = self.client.get(f"/api/houses/bundle/?ids={self.bare.id},9999,{self.complete.id}")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([item["id"] for item in results], [self.bare.id, self.complete.id])
+        self.assertIsNone(results[0]["detail"])
+        self.assertIsNone(results[0]["photos"])
+        self.assertEqual(results[1]["detail"], {"beds": 3})
+        self.assertEqual(response.json()["missing"], [9999])
+
+    def test_invalid_batch(self):
+        self.assertEqual(self.client.get("/api/houses/bundle/").status_code, 400)
+        self.assertEqual(self.client.get("/api/houses/bundle/?ids=1,abc").status_code, 400)
+        ids = ",".join(str(value) for value in range(1, 52))
+        self.assertEqual(self.client.get(f"/api/houses/bundle/?ids={ids}").status_code, 400)
+
+
+class HouseImageTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.house, self.bare = _create_houses(2)
+        photos = [
+            {"href": f"https://example.com/{index}s.jpg", "tags": [{"label": "kitchen"}]}
+            for index in range(5)
+        ]
+        photos.insert(2, {"href": "https://example.com/plan.gif"})
+        photos.insert(3, {"title": "no href"})
+        # Single-row writes rebuild the images through post_save.
+        HousePhoto.objects.create(house=self.house, payload=photos)
+
+    def test_variants_are_precomputed(self):
+        images = list(HouseImage.objects.filter(house=self.house).order_by("ordinal"))
+        self.assertEqual([image.ordinal for image in images], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(images[0].original_url, "https://example.com/0o.jpg")
+        self.assertEqual(images[0].large_url, "https://example.com/0l.jpg")
+        self.assertEqual(images[0].medium_url, "https://example.com/0m.jpg")
+        self.assertEqual(images[0].tags, ["kitchen"])
+        # No size code to swap: keep the URL as-is and leave variants blank.
+        self.assertEqual(images[2].original_url, "https://example.com/plan.gif")
+        self.assertEqual(images[2].small_url, "")
+
+    def test_saving_photos_rebuilds_images(self):
+        photo = HousePhoto.objects.get(house=self.house)
+        photo.payload = [{"href": "https://example.com/newm.jpg"}]
+        photo.save()
+        images = self.client.get(f"/api/houses/{self.house.id}/images/").json()["results"]
+        self.assertEqual([image["original_url"] for image in images], ["https://example.com/newo.jpg"])
+
+        HousePhoto.objects.update_or_create(house=self.bare, defaults={"payload": [{"href": "https://example.com/bs.jpg"}]})
+        self.assertEqual(HouseImage.objects.filter(house=self.bare).count(), 1)
+
+    def test_images_are_keyset_paged(self):
+        with assert_statements(self, 1):
+            first = self.client.get(f"/api/houses/{self.house.id}/images/?limit=4").json()
+        self.assertEqual([image["ordinal"] for image in first["results"]], [0, 1, 2, 3])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([image["ordinal"] for image in second["results"]], [4, 5])
+        self.assertIsNone(second["next"])
+
+    def test_images_for_unknown_house(self):
+        self.assertEqual(self.client.get(f"/api/houses/{self.bare.id}/images/").json()["results"], [])
+        self.assertEqual(self.client.get("/api/houses/9999/images/").status_code, 404)
+
+    def test_thumbnails_in_one_query(self):
+        with assert_statements(self, 1):
+            response = self.client.get(f"/api/houses/thumbnails/?ids={self.bare.id},{self.house.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "house_id": self.house.id,
+                    "small_url": "https://example.com/0s.jpg",
+                    "medium_url": "https://example.com/0m.jpg",
+                    "original_url": "https://example.com/0o.jpg",
+                }
+            ],
+        )
+        self.assertEqual(response.json()["missing"], [self.bare.id])
+        self.assertEqual(self.client.get("/api/houses/thumbnails/?ids=x").status_code, 400)
+
+    def test_ingest_replaces_images(self):
+        def route(query, body):
+            photos = [{"href": "https://example.com/news.jpg"}]
+            return 200, {"data": {"home_search": {"results": [{"photos": photos}]}}}
+
+        with StubRealtyServer({"/properties/v3/get-photos": route}):
+            call_command("ingest_realty_photos", "--house-id", str(self.house.id), "--rate", "0", stdout=StringIO())
+
+        self.assertEqual(
+            list(HouseImage.objects.filter(house=self.house).values_list("original_url", flat=True)),
+            ["https://example.com/newo.jpg"],
+        )
+
+
+class DetailProjectionTests(TestCase):
+    payload = {
+        "description": {"beds": 3, "baths": 2, "text": "Sunny", "name": "unused"},
+        "details": [{"category": "Interior", "text": ["Fireplace"]}],
+        "location": {"address": {"line": "1 Main St"}, "county": {"name": "LA"}},
+        "photos": [{"href": "a.jpg", "tags": ["kitchen"]}, {"href": "b.jpg"}],
+        "tax_history": [{"year": 2020}],
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.house, = _create_houses(1)
+        HouseDetail.objects.create(
+            house=self.house,
+            payload=self.payload,
+            card_payload=project(self.payload, PRESETS["card"]),
+        )
+
+    def test_project_dotted_paths(self):
+        self.assertEqual(
+            project(self.payload, ["description.beds", "photos.href", "missing.key"]),
+            {"description": {"beds": 3}, "photos": [{"href": "a.jpg"}, {"href": "b.jpg"}]},
+        )
+        self.assertEqual(project(self.payload, ["location", "location.address"])["location"], self.payload["location"])
+
+    def test_detail_fields_param(self):
+        url = f"/api/houses/{self.house.id}/detail/"
+        self.assertEqual(self.client.get(url).json(), self.payload)
+        self.assertEqual(self.client.get(f"{url}?fields=full").json(), self.payload)
+        self.assertEqual(self.client.get(f"{url}?fields=tax_history").json(), {"tax_history": [{"year": 2020}]})
+        card = self.client.get(f"{url}?fields=card").json()
+        self.assertEqual(set(card), {"description", "details", "location"})
+        self.assertNotIn("name", card["description"])
+        self.assertEqual(self.client.get(f"{url}?fields=a..b").status_code, 400)
+
+    def test_card_preset_reads_stored_projection(self):
+        HouseDetail.objects.filter(house=self.house).update(card_payload={"stored": True})
+        response = self.client.get(f"/api/houses/{self.house.id}/detail/?fields=card")
+        self.assertEqual(response.json(), {"stored": True})
+        response = self.client.get(f"/api/houses/bundle/?ids={self.house.id}&fields=card")
+        self.assertEqual(response.json()["results"][0]["detail"], {"stored": True})
+
+
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.house, = _create_houses(1)
+        self.detail = HouseDetail.objects.create(house=self.house, payload={"text": "x" * 2000})
+        HousePhoto.objects.create(house=self.house, payload=[{"href": "https://example.com/a.jpg"}])
+
+    def _revalidate(self, path, response, **headers):
+        return self.client.get(path, HTTP_IF_NONE_MATCH=response["ETag"], **headers)
+
+    def test_detail_and_photos_return_304_until_refetched(self):
+        for path in (f"/api/houses/{self.house.id}/detail/", f"/api/houses/{self.house.id}/photos/"):
+            first = self.client.get(path)
+            self.assertEqual(first.status_code, 200)
+            self.assertIn("Last-Modified", first)
+            self.assertEqual(self._revalidate(path, first).status_code, 304)
+            since = self.client.get(path, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+            self.assertEqual(since.status_code, 304)
+
+        path = f"/api/houses/{self.house.id}/detail/"
+        first = self.client.get(path)
+        self.assertEqual(self._revalidate(f"{path}?fields=text", first).status_code, 200)
+        self.detail.payload = {"text": "refetched"}
+        self.detail.save()
+        self.assertEqual(self._revalidate(path, first).status_code, 200)
+
+    def test_bundle_etag_tracks_counters(self):
+        path = f"/api/houses/bundle/?ids={self.house.id}"
+        first = self.client.get(path)
+        self.assertEqual(self._revalidate(path, first).status_code, 304)
+
+        record_swipe(HouseLike, self.house.id)
+        self.assertEqual(self._revalidate(path, first).status_code, 200)
+
+    def test_gzip(self):
+        response = self.client.get(f"/api/houses/{self.house.id}/detail/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith("W/"))
+        self.assertEqual(self._revalidate(f"/api/houses/{self.house.id}/detail/", response).status_code, 304)
+
+
+class HouseCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        reset_cache_stats()
+
+    def test_detail_is_served_from_cache_until_ingest_rewrites_it(self):
+        house, = _create_houses(1)
+        HouseDetail.objects.create(house=house, payload={"description": {"beds": 1}})
+        path = f"/api/houses/{house.id}/detail/"
+
+        self.assertEqual(self.client.get(path)["X-Cache"], "MISS")
+        with assert_statements(self, 0):
+            response = self.client.get(path)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json(), {"description": {"beds": 1}})
+
+        def route(query, body):
+            return 200, {"data": {"home": {"description": {"beds": 4}}}}
+
+        with StubRealtyServer({"/properties/v3/detail": route}):
+            call_command("ingest_realty_detail", "--rate", "0", stdout=StringIO())
+
+        response = self.client.get(path)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json(), {"description": {"beds": 4}})
+        self.assertEqual(self.client.get(f"{path}?fields=card").json(), {"description": {"beds": 4}})
+
+        stats = self.client.get("/api/cache/stats/").json()
+        self.assertEqual((stats["detail_hits"], stats["detail_misses"]), (1, 3))
+
+    def test_deploy_check_requires_a_shared_cache(self):
+        self.assertEqual([message.id for message in check_shared_cache(None)], ["houses.W001", "houses.W002"])
+        dummy = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+        with override_settings(CACHES={"default": dummy, "deck_queues": dummy}):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_deck_pages_reflect_swipes_immediately(self):
+        # Deck pages aren't cached: each one is a single indexed query, and a
+        # swipe changes them for every client.
+        first, second = _create_houses(2)
+        with assert_statements(self, 1):
+            response = self.client.get("/api/deck/")
+        self.assertEqual([item["id"] for item in response.json()["results"]], [first.id, second.id])
+
+        self.client.post(f"/api/houses/{first.id}/like/")
+        response = self.client.get("/api/deck/")
+        self.assertEqual([item["id"] for item in response.json()["results"]], [second.id])
+        self.assertNotIn("deck_hits", self.client.get("/api/cache/stats/").json())
+
+
+class FastSerializationTests(TestCase):
+    def test_list_rows_match_house_serializer(self):
+        houses = _create_houses(3)
+        House.objects.filter(id=houses[0].id).update(baths=2.5, lat=34.1, lng=-118.2, list_date=timezone.now())
+        HouseSave.objects.create(house=houses[0])
+        expected = json.loads(json.dumps(HouseSerializer(House.objects.order_by("id"), many=True).data))
+
+        deck = APIClient().get("/api/deck/?include_seen=1").json()["results"]
+        saved = APIClient().get("/api/saved/").json()["results"]
+
+        self.assertEqual(deck, expected)
+        self.assertEqual(saved, expected[:1])
+
+    def test_renderer_matches_drf_encoding(self):
+        data = {"when": timezone.now(), "price": Decimal("1.50"), "items": [1, None, "é"]}
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        # The test database is already a scratch database.
+        call_command(
+            "benchmark_house_serialization", "--rows", "140", "--repeat", "1", "--in-place", stdout=out, stderr=out
+        )
+        self.assertIn("Serialize+encode speedup", out.getvalue())
+        self.assertNotIn("differs", out.getvalue())
+        self.assertFalse(House.objects.exists())
+
+    def test_benchmark_command_uses_scratch_database_by_default(self):
+        creation = connection.creation
+        with mock.patch.object(creation, "create_test_db") as create, \
+                mock.patch.object(creation, "destroy_test_db") as destroy:
+            call_command("benchmark_house_serialization", "--rows", "70", "--repeat", "1", stdout=StringIO())
+
+        create.assert_called_once()
+        destroy.assert_called_once_with(connection.settings_dict["NAME"], verbosity=0)
+
+
+@override_settings(DECK_QUEUE_SIZE=4, DECK_QUEUE_WARM=2, DECK_QUEUE_WARM_ASYNC=False)
+class DeckQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_queue_serves_batches_and_refills(self):
+        houses = _create_houses(7)
+        HouseLike.objects.create(house=houses[1])
+        for house in houses:
+            HouseDetail.objects.create(house=house, payload={"id": house.id})
+
+        created = self.client.post("/api/deck/queue/?count=2")
+        self.assertEqual(created.status_code, 201)
+        token = created.json()["session"]
+        self.assertEqual([card["id"] for card in created.json()["results"]], [houses[0].id, houses[2].id])
+
+        # The next cards' details were warmed.
+        with assert_statements(self, 0):
+            self.assertEqual(self.client.get(f"/api/houses/{houses[3].id}/detail/")["X-Cache"], "HIT")
+        response = self.client.get(f"/api/deck/queue/{token}/?count=1")
+        self.assertEqual([card["id"] for card in response.json()["results"]], [houses[3].id])
+
+        ids = []
+        while True:
+            batch = self.client.get(f"/api/deck/queue/{token}/?count=2").json()["results"]
+            if not batch:
+                break
+            ids.extend(card["id"] for card in batch)
+        self.assertEqual(ids, [house.id for house in houses[4:]])
+
+    def test_queue_respects_filters_and_expiry(self):
+        cheap, pricey = _create_houses(2)
+        House.objects.filter(id=pricey.id).update(price=900000)
+        House.objects.filter(id=cheap.id).update(price=100000)
+        response = self.client.post("/api/deck/queue/?max_price=200000")
+        self.assertEqual([card["id"] for card in response.json()["results"]], [cheap.id])
+        self.assertEqual(self.client.post("/api/deck/queue/?max_price=abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/deck/queue/unknown/").status_code, 404)
+
+    def test_session_survives_payload_cache_culling(self):
+        houses = _create_houses(3)
+        token = self.client.post("/api/deck/queue/?count=1").json()["session"]
+        with mock.patch.object(get_cache(), "_max_entries", 5):
+            set_payloads({payload_key("detail", index): {"body": b"{}"} for index in range(50)})
+        response = self.client.get(f"/api/deck/queue/{token}/?count=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([card["id"] for card in response.json()["results"]], [houses[1].id])
+
+    @override_settings(DECK_QUEUE_SIZE=20, DECK_QUEUE_WARM_ASYNC=True)
+    def test_takes_leave_database_work_off_the_request(self):
+        houses = _create_houses(12)
+        with mock.patch("houses.deckqueue.warm_executor") as executor:
+            token = self.client.post("/api/deck/queue/?count=2").json()["session"]
+            for start in range(2, 10, 2):
+                # Queue read and write only: no refill, and warming is queued.
+                with assert_statements(self, 0):
+                    response = self.client.get(f"/api/deck/queue/{token}/?count=2")
+                self.assertEqual(
+                    [card["id"] for card in response.json()["results"]],
+                    [house.id for house in houses[start:start + 2]],
+                )
+        _, house_ids = executor.submit.call_args.args
+        self.assertEqual(house_ids, [houses[10].id, houses[11].id])
@@ -1,22 +1,38 @@
 from django.urls import path
 from houses.views import (
     HouseDeckView,
+    HouseImageListView,
     SavedHouseListView,
+    create_deck_queue,
     dislike_house,
+    house_bundle,
+    house_bundles,
+    house_cache_stats,
     house_detail,
     house_photos,
+    house_thumbnails,
+    next_deck_cards,
     like_house,
+    record_swipe_batch,
     save_house,
     unsave_house,
 )
 
 urlpatterns = [
     path("deck/", HouseDeckView.as_view(), name="house-deck"),
+    path("deck/queue/", create_deck_queue, name="house-deck-queue"),
+    path("deck/queue/<str:token>/", next_deck_cards, name="house-deck-queue-next"),
     path("saved/", SavedHouseListView.as_view(), name="house-saved"),
+    path("cache/stats/", house_cache_stats, name="house-cache-stats"),
+    path("swipes/", record_swipe_batch, name="house-swipes"),
+    path("houses/bundle/", house_bundles, name="house-bundles"),
+    path("houses/thumbnails/", house_thumbnails, name="house-thumbnails"),
+    path("houses/<int:house_id>/bundle/", house_bundle, name="house-bundle"),
     path("houses/<int:house_id>/like/", like_house, name="house-like"),
     path("houses/<int:house_id>/dislike/", dislike_house, name="house-dislike"),
     path("houses/<int:house_id>/save/", save_house, name="house-save"),
     path("houses/<int:house_id>/unsave/", unsave_house, name="house-unsave"),
     path("houses/<int:house_id>/detail/", house_detail, name="house-detail"),
     path("houses/<int:house_id>/photos/", house_photos, name="house-photos"),
+    path("houses/<int:house_id>/images/", HouseImageListView.as_view(), name="house-images"),
 ]
@@ -1,39 +1,148 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import ListAPIView
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from houses.models import House, HouseDetail, HouseDislike, HouseLike, HousePhoto, HouseSave
-from houses.serializers import HouseSerializer
+from houses.cache import (
+    cache_stats,
+    get_payload,
+    json_response,
+    set_payload,
+)
+from houses.conditional import add_validators, make_etag, not_modified
+from houses.deck import build_deck_queryset
+from houses.deckqueue import DeckQueue
+from houses.engagement import adjust_counter, record_save, record_swipe
+from houses.models import House, HouseDislike, HouseImage, HouseLike, HouseSave
+from houses.pagination import DeckPagination, HouseImagePagination, SavedHousePagination
+from houses.projection import is_preset, parse_fields, project
+from houses.serializers import (
+    HouseBundleSerializer,
+    HouseImageSerializer,
+    HouseSerializer,
+    SwipeBatchSerializer,
+)
+from houses.swipes import record_swipes
 
 
-class HouseDeckView(ListAPIView):
+class HouseRowListView(ListAPIView):
+    """List ``.values()`` rows instead of model instances.
+
+    Every field of the serializer is a JSON-native column, so rows are
+    returned as-is without per-field ``to_representation`` calls. Columns
+    the keyset cursor needs are fetched too and stripped once the page is
+    cut.
+    """
+
     serializer_class = HouseSerializer
 
+    def list(self, request, *args, **kwargs):
+        fields = self.get_serializer_class().Meta.fields
+        ordering = [name.lstrip("-") for name in getattr(self.paginator, "ordering", ())]
+        extra = [name for name in ordering if name not in fields]
+        rows = self.paginate_queryset(self.get_queryset().values(*fields, *extra))
+        for row in rows:
+            for name in extra:
+                del row[name]
+        return self.get_paginated_response(rows)
+
+
+class HouseDeckView(HouseRowListView):
+    pagination_class = DeckPagination
+
     def get_queryset(self):
-        # Debug-safe: return all houses to confirm data flow end-to-end.
-        return House.objects.all().order_by("id")
+        return build_deck_queryset(self.request.query_params).order_by("id")
 
 
-class SavedHouseListView(ListAPIView):
-    serializer_class = HouseSerializer
+class SavedHouseListView(HouseRowListView):
+    pagination_class = SavedHousePagination
 
     def get_queryset(self):
-        return House.objects.filter(saves__isnull=False).distinct().order_by("-list_date")
+        # HouseSave is unique per house, so the join cannot duplicate rows.
+        return House.objects.filter(saves__isnull=False).order_by("-list_date", "-id")
+
+
+class HouseImageListView(HouseRowListView):
+    serializer_class = HouseImageSerializer
+    pagination_class = HouseImagePagination
+
+    def get_queryset(self):
+        return HouseImage.objects.filter(house_id=self.kwargs["house_id"])
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Only an empty page needs to tell "no photos" from "no house".
+        if not response.data["results"] and not House.objects.filter(id=self.kwargs["house_id"]).exists():
+            raise NotFound("House not found")
+        return response
+
+
+MAX_QUEUE_BATCH = 50
+
+
+def _queue_batch_size(request):
+    default = getattr(settings, "DECK_QUEUE_BATCH", 10)
+    try:
+        count = int(request.query_params.get("count", default))
+    except ValueError:
+        return default
+    return max(1, min(count, MAX_QUEUE_BATCH))
+
+
+@api_view(["POST"])
+def create_deck_queue(request):
+    queue = DeckQueue.create(request.query_params)
+    cards = queue.take(_queue_batch_size(request))
+    return Response(
+        {"session": queue.token, "results": cards, "remaining": len(queue.cards)},
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@api_view(["GET"])
+def next_deck_cards(request, token):
+    queue = DeckQueue.load(token)
+    if queue is None:
+        return Response(
+            {"error": "Deck session not found or expired"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    cards = queue.take(_queue_batch_size(request))
+    return Response(
+        {"session": queue.token, "results": cards, "remaining": len(queue.cards)},
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["POST"])
+def record_swipe_batch(request):
+    serializer = SwipeBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    swipes = serializer.validated_data["swipes"]
+
+    requested = {swipe["house_id"] for swipe in swipes}
+    known = set(House.objects.filter(id__in=requested).values_list("id", flat=True))
+    events = [(swipe["action"], swipe["house_id"]) for swipe in swipes if swipe["house_id"] in known]
+    record_swipes(events)
+
+    return Response(
+        {"accepted": len(events), "missing": sorted(requested - known)},
+        status=status.HTTP_202_ACCEPTED,
+    )
 
 
 @api_view(["POST"])
 def like_house(request, house_id):
-    try:
-        house = House.objects.get(id=house_id)
-    except House.DoesNotExist:
+    if not record_swipe(HouseLike, house_id):
         return Response(
             {"error": "House not found"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    HouseLike.objects.create(house=house)
-
     return Response(
         {"success": True},
         status=status.HTTP_201_CREATED,
@@ -42,16 +151,12 @@ def like_house(request, house_id):
 
 @api_view(["POST"])
 def dislike_house(request, house_id):
-    try:
-        house = House.objects.get(id=house_id)
-    except House.DoesNotExist:
+    if not record_swipe(HouseDislike, house_id):
         return Response(
             {"error": "House not found"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    HouseDislike.objects.create(house=house)
-
     return Response(
         {"success": True},
         status=status.HTTP_201_CREATED,
@@ -60,16 +165,13 @@ def dislike_house(request, house_id):
 
 @api_view(["POST"])
 def save_house(request, house_id):
-    try:
-        house = House.objects.get(id=house_id)
-    except House.DoesNotExist:
+    found, _ = record_save(house_id)
+    if not found:
         return Response(
             {"error": "House not found"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    HouseSave.objects.get_or_create(house=house)
-
     return Response(
         {"success": True},
         status=status.HTTP_201_CREATED,
@@ -78,50 +180,190 @@ def save_house(request, house_id):
 
 @api_view(["DELETE"])
 def unsave_house(request, house_id):
-    deleted, _ = HouseSave.objects.filter(house_id=house_id).delete()
+    with transaction.atomic():
+        deleted, _ = HouseSave.objects.filter(house_id=house_id).delete()
+        if deleted:
+            adjust_counter(HouseSave, house_id, -deleted)
     return Response(
         {"success": deleted > 0},
         status=status.HTTP_200_OK,
     )
 
 
+MAX_BUNDLE_IDS = 50
+
+
+def _bundle_queryset(fields):
+    qs = House.objects.select_related("detail", "photos")
+    if is_preset(fields, "card"):
+        return qs.defer("detail__payload")
+    return qs.defer("detail__card_payload")
+
+
+def _bundle_version(house):
+    """Values a house's bundle depends on; counters change without ``updated_at``."""
+    stamps = [house.id, house.updated_at, house.like_count, house.dislike_count, house.save_count]
+    for relation in ("detail", "photos"):
+        related = getattr(house, relation, None)
+        stamps.append(related.fetched_at if related else None)
+    return stamps
+
+
 @api_view(["GET"])
-def house_detail(request, house_id):
-    try:
-        house = House.objects.get(id=house_id)
-    except House.DoesNotExist:
+def house_bundle(request, house_id):
+    fields = parse_fields(request.query_params)
+    house = _bundle_queryset(fields).filter(id=house_id).first()
+    if house is None:
         return Response(
             {"error": "House not found"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
+    etag = make_etag("bundle", fields, *_bundle_version(house))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    serializer = HouseBundleSerializer(house, context={"detail_fields": fields})
+    return add_validators(Response(serializer.data, status=status.HTTP_200_OK), etag)
+
+
+def _house_ids(request, limit=MAX_BUNDLE_IDS):
+    """Parse ``?ids=1,2,3``; return ``(ids, None)`` or ``(None, error response)``."""
     try:
-        detail = HouseDetail.objects.get(house=house)
-    except HouseDetail.DoesNotExist:
-        return Response(
-            {"error": "House detail not available"},
-            status=status.HTTP_404_NOT_FOUND,
+        ids = [int(value) for value in request.query_params.get("ids", "").split(",") if value.strip()]
+    except ValueError:
+        return None, Response(
+            {"error": "ids must be a comma-separated list of house IDs"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    ids = list(dict.fromkeys(ids))
+    if not ids or len(ids) > limit:
+        return None, Response(
+            {"error": f"Pass between 1 and {limit} house IDs"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    return ids, None
+
 
-    return Response(detail.payload, status=status.HTTP_200_OK)
+@api_view(["GET"])
+def house_bundles(request):
+    fields = parse_fields(request.query_params)
+    ids, error = _house_ids(request)
+    if error is not None:
+        return error
+
+    houses = {house.id: house for house in _bundle_queryset(fields).filter(id__in=ids)}
+    ordered = [houses[house_id] for house_id in ids if house_id in houses]
+    versions = [stamp for house in ordered for stamp in _bundle_version(house)]
+    etag = make_etag("bundles", fields, ids, *versions)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    response = Response(
+        {
+            "results": HouseBundleSerializer(ordered, many=True, context={"detail_fields": fields}).data,
+            "missing": [house_id for house_id in ids if house_id not in houses],
+        },
+        status=status.HTTP_200_OK,
+    )
+    return add_validators(response, etag)
+
+
+THUMBNAIL_FIELDS = ["house_id", "small_url", "medium_url", "original_url"]
+
+
+@api_view(["GET"])
+def house_thumbnails(request):
+    """First photo of each requested house, for deck cards, in one query."""
+    ids, error = _house_ids(request)
+    if error is not None:
+        return error
+
+    thumbnails = {
+        row["house_id"]: row
+        for row in HouseImage.objects.filter(house_id__in=ids, ordinal=0).values(*THUMBNAIL_FIELDS)
+    }
+    return Response(
+        {
+            "results": [thumbnails[house_id] for house_id in ids if house_id in thumbnails],
+            "missing": [house_id for house_id in ids if house_id not in thumbnails],
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+def _related_payload(house_id, relation, column="payload"):
+    """Fetch a house's one-to-one payload with one LEFT JOIN query.
+
+    Returns None if the house doesn't exist, otherwise
+    ``(found, payload, fetched_at)`` where ``found`` says whether the
+    related row exists.
+    """
+    row = (
+        House.objects.filter(id=house_id)
+        .values_list(f"{relation}__id", f"{relation}__{column}", f"{relation}__fetched_at")
+        .first()
+    )
+    if row is None:
+        return None
+    related_id, payload, fetched_at = row
+    return related_id is not None, payload, fetched_at
+
+
+def _payload_response(request, kind, house_id, fields=None):
+    """Serve a house's detail or photos payload through the cache.
+
+    The whole payload and the stored card projection are cached as rendered
+    JSON with their validators, so a hit needs no database query. Other
+    ``fields`` projections are built from the database each time.
+    """
+    stored_card = is_preset(fields, "card")
+    variant = "card" if stored_card else ("full" if fields is None else None)
+    entry = get_payload(kind, house_id, variant) if variant else None
+    outcome = "HIT"
+
+    if entry is None:
+        outcome = "MISS"
+        result = _related_payload(house_id, kind, "card_payload" if stored_card else "payload")
+        if result is None:
+            return Response(
+                {"error": "House not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        found, payload, fetched_at = result
+        if not found:
+            return Response(
+                {"error": f"House {kind} not available"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if variant is None:
+            etag = make_etag(kind, house_id, fetched_at, fields)
+            cached = not_modified(request, etag, fetched_at)
+            if cached is not None:
+                return cached
+            return add_validators(Response(project(payload, fields), status=status.HTTP_200_OK), etag, fetched_at)
+        entry = set_payload(kind, house_id, variant, payload, fetched_at)
+
+    cached = not_modified(request, entry["etag"], entry["last_modified"])
+    if cached is not None:
+        return cached
+    return add_validators(json_response(entry["body"], outcome), entry["etag"], entry["last_modified"])
+
+
+@api_view(["GET"])
+def house_detail(request, house_id):
+    return _payload_response(request, "detail", house_id, parse_fields(request.query_params))
 
 
 @api_view(["GET"])
 def house_photos(request, house_id):
-    try:
-        house = House.objects.get(id=house_id)
-    except House.DoesNotExist:
-        return Response(
-            {"error": "House not found"},
-            status=status.HTTP_404_NOT_FOUND,
-        )
+    return _payload_response(request, "photos", house_id)
 
-    try:
-        photos = HousePhoto.objects.get(house=house)
-    except HousePhoto.DoesNotExist:
-        return Response(
-            {"error": "House photos not available"},
-            status=status.HTTP_404_NOT_FOUND,
-        )
 
-    return Response(photos.payload, status=status.HTTP_200_OK)
+@api_view(["GET"])
+def house_cache_stats(request):
+    return Response(cache_stats(), status=status.HTTP_200_OK)